@@ -1,13 +1,51 @@
 import psycopg2
+import psycopg2.errors
 import requests
+import argparse
 import os
 import json
+import re
+import sys
+import tempfile
 import time
 
+from allergens import ALLERGEN_GROUPS, exclusion_patterns
+from bulk_load import bulk_load_snapshot
+from canonical import canonical_name
 from connect import DATABASE, USER, PASSWORD, HOST, PORT
+from crawler import CRAWL_WORKERS, crawl_all_meals, crawl_by_first_letter, sync_meals, write_cache
+from db_pool import (
+    WARMUP_INTERVAL, close_pool, execute_prepared, run_read, start_warmup,
+    print_stats as print_pool_stats,
+)
+from mealdb_client import get_json, print_stats, request_count, reset_stats
+from migrations import LATEST_VERSION, applied_version, apply_migrations
+from recipe_index import RecipeIndex
+from snapshot import (
+    SNAPSHOT_FILE, SNAPSHOT_VERSION, Snapshot, build_snapshot,
+    fingerprint as snapshot_fingerprint, is_current as snapshot_is_current,
+)
+
+PROCESS_START = time.perf_counter()
+
+# Bump when the loader starts writing data an older load did not, so an
+# unchanged snapshot is still reloaded once.
+LOADER_VERSION = 5
 
 ingredient_cache = {}
 
+def get_connection(**kwargs):
+    """Open a connection to the recipes database"""
+    return psycopg2.connect(
+        database=DATABASE,
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        port=PORT,
+        # sslmode='require'
+        **kwargs
+    )
+
 def preload_ingredient_cache(cursor):
     """Load all existing ingredients into memory cache"""
     cursor.execute("SELECT id, name FROM ingredient_list;")
@@ -15,81 +53,86 @@ def preload_ingredient_cache(cursor):
         ingredient_cache[name.strip().lower()] = ingredient_id
 
 def create_tables(cursor):
-    """Create normalized tables for recipes and ingredients"""
+    """Bring the schema up to the latest migration (see migrations.py)"""
+    apply_migrations(cursor)
+
+def resolve_ingredients(cursor, ingredient_names):
+    """Return {normalized name: id} for a batch of names, inserting new ones.
+
+    Names missing from ingredient_cache are upserted in one round trip
+    together with their canonical names, which point at themselves; each
+    raw name is linked to its canonical row. The cache is filled with the
+    results.
+    """
+    normalized = {name.strip().lower() for name in ingredient_names if name and name.strip()}
+    missing = sorted(name for name in normalized if name not in ingredient_cache)
+    if missing:
+        cursor.execute("""
+            INSERT INTO ingredient_list (name)
+            SELECT DISTINCT unnest(%(canonical)s::text[])
+            ON CONFLICT (name) DO NOTHING;
+
+            UPDATE ingredient_list
+            SET canonical_id = id
+            WHERE name = ANY(%(canonical)s) AND canonical_id IS DISTINCT FROM id;
+
+            INSERT INTO ingredient_list (name, canonical_id)
+            SELECT input.name, c.id
+            FROM unnest(%(names)s::text[], %(canonical)s::text[]) AS input (name, canonical)
+            JOIN ingredient_list c ON c.name = input.canonical
+            ON CONFLICT (name) DO UPDATE
+            SET canonical_id = EXCLUDED.canonical_id
+            RETURNING name, id;
+        """, {"names": missing, "canonical": [canonical_name(name) for name in missing]})
+        for name, ingredient_id in cursor.fetchall():
+            ingredient_cache[name] = ingredient_id
+    return {name: ingredient_cache[name] for name in normalized}
+
+
+def insert_recipe_row(cursor, row):
+    """Insert one recipe row; returns its meal_id, or None if it already existed"""
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS recipes (
-            meal_id INTEGER PRIMARY KEY,
-            name TEXT,
-            category TEXT,
-            area TEXT,
-            instructions TEXT
-        );
-    """)
+        INSERT INTO recipes (meal_id, name, category, area, instructions,
+                             thumbnail, tags, youtube, source)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (meal_id) DO NOTHING
+        RETURNING meal_id;
+    """, row)
+    result = cursor.fetchone()
+    return result[0] if result else None
+
+
+def insert_ingredient_line(cursor, recipe_id, position, ingredient_id, measure):
+    """Insert one ingredient line of a recipe and its search link to the canonical ingredient"""
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS ingredient_list (
-            id SERIAL PRIMARY KEY,
-            name TEXT UNIQUE
-        );
-    """)
+        INSERT INTO recipe_ingredient_lines (recipe_id, position, ingredient_id, measure)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT DO NOTHING;
+    """, (recipe_id, position, ingredient_id, measure))
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS recipe_ingredients (
-            recipe_id INTEGER REFERENCES recipes(meal_id),
-            ingredient_id INTEGER REFERENCES ingredient_list(id),
-            PRIMARY KEY (recipe_id, ingredient_id)
-        );
-    """)
-
-def insert_ingredient(cursor, ingredient_name):
-   """Insert ingredient using in-memory cache for speed"""
-   normalized = ingredient_name.strip().lower()
-
-  # Check in cache
-   if normalized in ingredient_cache:
-        return ingredient_cache[normalized]
-
-  # Insert into DB if not in cache
-   cursor.execute("""
-        INSERT INTO ingredient_list (name)
-        VALUES (%s)
-        ON CONFLICT (name) DO NOTHING;
-    """, (normalized,))
-
-  # Getting ID
-   cursor.execute("SELECT id FROM ingredient_list WHERE name = %s;", (normalized,))
-   ingredient_id = cursor.fetchone()[0]
-
-  # Cache update
-   ingredient_cache[normalized] = ingredient_id
-   return ingredient_id
-
-
-def insert_recipe_with_ingredients(cursor, meal):
-    """Insert recipe and its ingredients into normalized tables"""
+        INSERT INTO recipe_ingredients (recipe_id, ingredient_id)
+        SELECT %s, canonical_id FROM ingredient_list WHERE id = %s
+        ON CONFLICT DO NOTHING;
+    """, (recipe_id, ingredient_id))
+
+
+def refresh_ingredient_arrays(cursor, meal_ids):
+    """Recompute recipes.ingredient_ids from recipe_ingredients for some recipes"""
+    ids = [int(meal_id) for meal_id in meal_ids]
+    if not ids:
+        return
     cursor.execute("""
-        INSERT INTO recipes (meal_id, name, category, area, instructions)
-        VALUES (%s, %s, %s, %s, %s)
-        ON CONFLICT (meal_id) DO NOTHING
-        RETURNING meal_id;
-    """, (
-        int(meal["idMeal"]),
-        meal["strMeal"],
-        meal["strCategory"],
-        meal["strArea"],
-        meal["strInstructions"]
-    ))
+        UPDATE recipes r
+        SET ingredient_ids = agg.ids
+        FROM (
+            SELECT recipe_id, array_agg(ingredient_id ORDER BY ingredient_id) AS ids
+            FROM recipe_ingredients
+            WHERE recipe_id = ANY(%s)
+            GROUP BY recipe_id
+        ) agg
+        WHERE r.meal_id = agg.recipe_id;
+    """, (ids,))
 
-    result = cursor.fetchone()
-    if result:
-        recipe_id = result[0]
-        for i in range(1, 21):
-            ingredient = meal.get(f"strIngredient{i}")
-            if ingredient and ingredient.strip():
-                ingredient_id = insert_ingredient(cursor, ingredient)
-                cursor.execute("""
-                    INSERT INTO recipe_ingredients (recipe_id, ingredient_id)
-                    VALUES (%s, %s)
-                    ON CONFLICT DO NOTHING;
-                """, (recipe_id, ingredient_id))
 
 def get_all_categories():
     """Fetch all recipe categories from API or cache"""
@@ -105,12 +148,9 @@ def get_all_categories():
                 print(f"Cache read error: {e}")
 
     # If the cache didn't work, we load it from the API
-    url = "https://www.themealdb.com/api/json/v1/1/list.php?c=list"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        categories = [item['strCategory'] for item in data.get('meals', [])]
+        data = get_json("list.php", c="list")
+        categories = [item['strCategory'] for item in data.get('meals') or []]
 
         with open(cache_file, "w") as f:
             json.dump(categories, f)
@@ -122,163 +162,694 @@ def get_all_categories():
         return []
 
 
-def load_recipes_by_category(cursor, connection):
+def get_loaded_meal_ids(cursor):
+    """Return the idMeal strings of all recipes already in the database"""
+    cursor.execute("SELECT meal_id FROM recipes;")
+    return {str(row[0]) for row in cursor.fetchall()}
+
+
+def load_snapshot(cursor, snapshot):
+    """Insert a normalized snapshot row by row (see bulk_load_snapshot).
+
+    Ingredient IDs are resolved once per vocabulary entry, and ingredient
+    links are only written for recipes that were not loaded before.
+    """
+    names = snapshot.ingredient_names()
+    resolved = resolve_ingredients(cursor, names)
+    ingredient_ids = [resolved[name] for name in names]
+
+    inserted = set()
+    for row in snapshot.iter_recipe_rows():
+        recipe_id = insert_recipe_row(cursor, row)
+        if recipe_id:
+            inserted.add(recipe_id)
+
+    for meal_id, ingredient_index, position, measure in snapshot.iter_recipe_ingredients():
+        if meal_id in inserted:
+            insert_ingredient_line(cursor, meal_id, position, ingredient_ids[ingredient_index], measure)
+    refresh_ingredient_arrays(cursor, inserted)
+
+
+def get_loaded_fingerprint(cursor):
+    """Return (content_hash, snapshot_version, loader_version) of the last load, or None"""
+    cursor.execute("SELECT content_hash, snapshot_version, loader_version FROM catalog_meta WHERE id = 1;")
+    return cursor.fetchone()
+
+
+def record_loaded_fingerprint(cursor, content_hash, recipe_count):
+    """Remember which snapshot the database now holds"""
+    cursor.execute("""
+        INSERT INTO catalog_meta (id, content_hash, snapshot_version, loader_version, recipe_count, loaded_at)
+        VALUES (1, %s, %s, %s, %s, now())
+        ON CONFLICT (id) DO UPDATE
+        SET content_hash = EXCLUDED.content_hash,
+            snapshot_version = EXCLUDED.snapshot_version,
+            loader_version = EXCLUDED.loader_version,
+            recipe_count = EXCLUDED.recipe_count,
+            loaded_at = EXCLUDED.loaded_at;
+    """, (content_hash, SNAPSHOT_VERSION, LOADER_VERSION, recipe_count))
+
+
+def load_recipes_by_category(cursor, connection, workers=CRAWL_WORKERS, sync=False, strategy="category",
+                             force=False):
+    """Load the recipe catalog into the database.
+
+    The catalog is bulk-loaded with COPY from the normalized binary
+    snapshot, which is rebuilt whenever recipes_cache.json is newer. The
+    load is skipped when catalog_meta shows the same snapshot was already
+    loaded, unless force=True. A cold crawl uses either the category/lookup
+    path (strategy="category") or the search.php?f= sweep
+    (strategy="letter"), whose gaps are filled from the category listings. With sync=True the cache is refreshed incrementally
+    and only new or changed meals (plus cached meals missing from the
+    database) are bulk-loaded from a snapshot of just those meals; a database last loaded by an older loader gets a
+    full load instead, since its unchanged recipes lack what the loader now
+    writes.
+
+    Returns the API requests that still failed after retries. When there are
+    any, neither the cache nor the database is touched and the crawl
+    checkpoint is kept, so the next run fetches only the missing records.
+    """
     cache_file = "recipes_cache.json"
-    if os.path.exists(cache_file):
-        with open(cache_file, "r") as f:
-            all_meals = json.load(f)
-    else:
-        all_meals = []
+    if sync:
+        cached_meals = None
+        if os.path.exists(cache_file):
+            with open(cache_file, "r") as f:
+                cached_meals = json.load(f)
+
+        loaded_ids = get_loaded_meal_ids(cursor)
+        loaded = get_loaded_fingerprint(cursor)
         categories = get_all_categories()
-        for category in categories:
-            url = f"https://www.themealdb.com/api/json/v1/1/filter.php?c={category}"
-            response = requests.get(url)
-            data = response.json()
-            meals = data.get("meals", [])
-            for meal in meals:
-                meal_id = meal["idMeal"]
-                detail_url = f"https://www.themealdb.com/api/json/v1/1/lookup.php?i={meal_id}"
-                detail_response = requests.get(detail_url)
-                detail_data = detail_response.json()
-                detailed_meal = detail_data.get("meals", [])[0]
-                all_meals.append(detailed_meal)
+        if not categories:
+            return ["list.php?c=list"]
+        all_meals, fetched_ids, failed = sync_meals(cached_meals or [], categories, workers=workers)
+        if failed:
+            return failed
+        if fetched_ids or cached_meals is None:
+            write_cache(cache_file, all_meals)
+        if loaded_ids and (loaded is None or loaded[2] != LOADER_VERSION):
+            print("Database was loaded by an older loader, reloading the whole catalog")
+            sync, force = False, True
+
+    if sync:
+        meals_to_insert = [
+            meal for meal in all_meals
+            if meal["idMeal"] in fetched_ids or meal["idMeal"] not in loaded_ids
+        ]
+        if meals_to_insert:
+            # Stage just the changed meals as a snapshot; the bulk merge upserts
+            # them and rewrites their ingredient lines in a few statements.
+            with tempfile.TemporaryDirectory() as tmp:
+                changes_file = os.path.join(tmp, "changes.snap")
+                build_snapshot(meals_to_insert, changes_file)
+                with Snapshot(changes_file) as changes:
+                    bulk_load_snapshot(cursor, changes)
+            preload_ingredient_cache(cursor)
+        if snapshot_is_current(SNAPSHOT_FILE, cache_file):
+            record_loaded_fingerprint(cursor, snapshot_fingerprint(SNAPSHOT_FILE), len(all_meals))
+        connection.commit()
+        return []
 
-        with open(cache_file, "w") as f:
-            json.dump(all_meals, f)
+    if not snapshot_is_current(SNAPSHOT_FILE, cache_file):
+        if os.path.exists(cache_file):
+            with open(cache_file, "r") as f:
+                build_snapshot(json.load(f), SNAPSHOT_FILE)
+        else:
+            categories = get_all_categories()
+            if not categories:
+                return ["list.php?c=list"]
+            if strategy == "letter":
+                all_meals, failed = crawl_by_first_letter(categories, workers=workers)
+            else:
+                all_meals, failed = crawl_all_meals(categories, workers=workers)
+            if failed:
+                return failed
+            write_cache(cache_file, all_meals)
+
+    content_hash = snapshot_fingerprint(SNAPSHOT_FILE)
+    if not force and get_loaded_fingerprint(cursor) == (content_hash, SNAPSHOT_VERSION, LOADER_VERSION):
+        print("Recipe catalog unchanged, skipping load")
+        return []
 
-    for meal in all_meals:
-        insert_recipe_with_ingredients(cursor, meal)
+    with Snapshot(SNAPSHOT_FILE) as snapshot:
+        bulk_load_snapshot(cursor, snapshot)
+        record_loaded_fingerprint(cursor, content_hash, snapshot.recipe_count)
+    preload_ingredient_cache(cursor)
 
     connection.commit()
+    return []
+
+
+def _excluded_cte(patterns, exceptions):
+    """CTE `excluded`: canonical IDs whose names match the exclusion regex pairs.
+
+    The pairs come from allergens.exclusion_patterns; the vocabulary is a few
+    hundred rows, so matching it is cheaper than any recipe-side work. Each
+    search then drops recipes with NOT ingredient_ids && excluded.ids, an
+    anti-join on the row it already reads, whatever the number of exclusions.
+    """
+    return f"""excluded AS (
+        SELECT coalesce(array_agg(DISTINCT il.id), '{{}}') AS ids
+        FROM ingredient_list il, unnest({patterns}::text[], {exceptions}::text[]) AS x(pattern, exception)
+        WHERE il.canonical_id = il.id AND il.name ~ x.pattern
+          AND (x.exception IS NULL OR il.name !~ x.exception)
+    )"""
+
+
+def _exclusion_params(exclude):
+    """Pattern and exception arrays for _excluded_cte, plus the pairs for a RecipeIndex"""
+    patterns = exclusion_patterns(exclude)
+    return patterns, [([pattern for pattern, _ in patterns], "text[]"),
+                      ([exception for _, exception in patterns], "text[]")]
+
+
+# Resolve the names to canonical IDs, then answer with array containment on
+# the GIN-indexed recipes.ingredient_ids; unknown names match nothing.
+FIND_ALL_INGREDIENTS_SQL = f"""
+    WITH wanted AS (
+        SELECT array_agg(DISTINCT canonical_id) AS ids, count(*) AS found
+        FROM ingredient_list
+        WHERE name = ANY($1)
+    ), {_excluded_cte("$2", "$3")}
+    SELECT r.meal_id, r.name, r.category, r.area
+    FROM recipes r, wanted w, excluded x
+    WHERE w.found = cardinality($1)
+      AND r.ingredient_ids @> w.ids
+      AND NOT r.ingredient_ids && x.ids
+"""
+
+
+def find_recipes_by_ingredients(cursor, ingredients, index=None, exclude=()):
+    """Find recipes that match all given ingredients.
+
+    `exclude` holds ingredient names and allergen group names (see
+    ALLERGEN_GROUPS); recipes using any of them are left out. With a
+    RecipeIndex the search runs in process and cursor is unused.
+    """
+    normalized = sorted({canonical_name(i) for i in ingredients})
+    patterns, exclusion = _exclusion_params(exclude)
+    if index is not None:
+        return index.find_all(normalized, patterns)
+    execute_prepared(cursor, "find_recipes_all", FIND_ALL_INGREDIENTS_SQL, [(normalized, "text[]")] + exclusion)
+    return cursor.fetchall()
 
 
-def find_recipes_by_ingredients(cursor, ingredients):
-    """Find recipes that match all given ingredients"""
-    normalized = [i.strip().lower() for i in ingredients]
-    placeholders = ','.join(['%s'] * len(normalized))
+EXPANSION_LIMIT = 8
+
+# Each term's closest ingredient names by pg_trgm strict word similarity,
+# so "chicken" also finds "chicken breast" and "tomatoe" finds "tomatoes".
+# term <<% name is answered from the trigram index on ingredient_list.name;
+# only canonical names are candidates.
+EXPAND_TERMS_SQL = """
+    SELECT t.term, m.name, m.score
+    FROM unnest($1) AS t(term)
+    CROSS JOIN LATERAL (
+        SELECT il.name, strict_word_similarity(t.term, il.name) AS score
+        FROM ingredient_list il
+        WHERE t.term <<% il.name AND il.canonical_id = il.id
+        ORDER BY score DESC, similarity(t.term, il.name) DESC, il.name
+        LIMIT $2
+    ) m
+"""
+
+
+def expand_ingredient_terms(cursor, terms, limit=EXPANSION_LIMIT, index=None):
+    """Resolve each term to ingredient names ranked by trigram similarity.
+
+    Returns {canonical term: [(canonical name, score), ...]}, best first; an
+    exact name always ranks first. Terms nothing resembles map to an empty
+    list.
+    """
+    normalized = sorted({canonical_name(t) for t in terms})
+    if index is not None:
+        return {term: index.expand(term, limit) for term in normalized}
+    execute_prepared(cursor, "expand_terms", EXPAND_TERMS_SQL, [(normalized, "text[]"), (limit, "integer")])
+    expansions = {term: [] for term in normalized}
+    for term, name, score in cursor.fetchall():
+        expansions[term].append((name, score))
+    return expansions
+
+
+# One group of candidate names per search term; a recipe must use at least
+# one ingredient from every group. The && prefilter on all candidate IDs is
+# answered by the GIN index before each group is checked.
+FIND_ANY_OF_EACH_SQL = f"""
+    WITH candidates AS (
+        SELECT c.term, il.canonical_id AS id
+        FROM unnest($1, $2) AS c(name, term)
+        JOIN ingredient_list il ON il.name = c.name
+    ), groups AS (
+        SELECT array_agg(id) AS ids FROM candidates GROUP BY term
+    ), {_excluded_cte("$4", "$5")}
+    SELECT r.meal_id, r.name, r.category, r.area
+    FROM recipes r, excluded x
+    WHERE r.ingredient_ids && (SELECT array_agg(id) FROM candidates)
+      AND NOT r.ingredient_ids && x.ids
+      AND (SELECT count(*) FROM groups g WHERE r.ingredient_ids && g.ids) = $3
+"""
+
+
+def find_recipes_by_ingredient_groups(cursor, groups, index=None, exclude=()):
+    """Find recipes that use at least one ingredient name from every group and nothing excluded"""
+    groups = [sorted({canonical_name(name) for name in group}) for group in groups]
+    patterns, exclusion = _exclusion_params(exclude)
+    if index is not None:
+        return index.find_groups(groups, patterns)
+    names = [name for group in groups for name in group]
+    terms = [position for position, group in enumerate(groups) for _ in group]
+    execute_prepared(cursor, "find_recipes_groups", FIND_ANY_OF_EACH_SQL,
+                     [(names, "text[]"), (terms, "integer[]"), (len(groups), "integer")] + exclusion)
+    return cursor.fetchall()
 
-    cursor.execute(f"""
-        SELECT r.name, r.category, r.area
-        FROM recipes r
-        JOIN recipe_ingredients ri ON r.meal_id = ri.recipe_id
-        JOIN ingredient_list il ON ri.ingredient_id = il.id
-        WHERE il.name IN ({placeholders})
-        GROUP BY r.meal_id, r.name, r.category, r.area
-        HAVING COUNT(DISTINCT il.name) = %s;
-    """, normalized + [len(normalized)])
 
+FACETS = ("category", "area")
+
+# The any-of-each search narrowed to a category and area, with both facets
+# counted in the same GROUPING SETS pass: the (meal_id, ...) set yields the
+# rows that pass both filters, the (category) and (area) sets the counts.
+# Each facet is counted under the other facet's filter only, so a count is
+# the number of rows choosing that value would leave. grouping() tells the
+# sets apart: 0 for rows, 5 for category counts, 6 for area counts.
+FACETED_SEARCH_SQL = f"""
+    WITH matches AS ({FIND_ANY_OF_EACH_SQL}), flagged AS (
+        SELECT m.*,
+               ($6::text IS NULL OR lower(m.category) = lower($6)) AS in_category,
+               ($7::text IS NULL OR lower(m.area) = lower($7)) AS in_area
+        FROM matches m
+    )
+    SELECT grouping(f.meal_id, f.category, f.area), f.meal_id, f.name, f.category, f.area,
+           count(*) FILTER (WHERE f.in_area), count(*) FILTER (WHERE f.in_category)
+    FROM flagged f
+    GROUP BY GROUPING SETS ((f.meal_id, f.name, f.category, f.area), (f.category), (f.area))
+    HAVING grouping(f.meal_id) = 1 OR bool_and(f.in_category AND f.in_area)
+"""
+
+
+def search_recipes_faceted(cursor, groups, category=None, area=None, exclude=(), index=None):
+    """find_recipes_by_ingredient_groups narrowed to a category and area, plus facet counts.
+
+    Returns (rows, facets); facets maps "category" and "area" to (value,
+    count) pairs, largest first, for every value with matching recipes.
+    """
+    groups = [sorted({canonical_name(name) for name in group}) for group in groups]
+    patterns, exclusion = _exclusion_params(exclude)
+    if index is not None:
+        return index.faceted(groups, category, area, patterns)
+    names = [name for group in groups for name in group]
+    terms = [position for position, group in enumerate(groups) for _ in group]
+    execute_prepared(cursor, "search_recipes_faceted", FACETED_SEARCH_SQL,
+                     [(names, "text[]"), (terms, "integer[]"), (len(groups), "integer")] + exclusion
+                     + [(category, "text"), (area, "text")])
+    rows = []
+    counts = {facet: [] for facet in FACETS}
+    for grouping, meal_id, name, category_value, area_value, category_count, area_count in cursor.fetchall():
+        if grouping == 0:
+            rows.append((meal_id, name, category_value, area_value))
+        elif grouping == 5 and category_count:
+            counts["category"].append((category_value or "Unknown", category_count))
+        elif grouping == 6 and area_count:
+            counts["area"].append((area_value or "Unknown", area_count))
+    return rows, {facet: sorted(pairs, key=lambda pair: (-pair[1], pair[0])) for facet, pairs in counts.items()}
+
+
+RANKED_LIMIT = 10
+
+# Partial match: count each recipe's hits on the wanted ingredient IDs (a
+# sparse matrix-vector product answered from the ingredient-first index),
+# keep the top $3, and only then list what each of those recipes is missing.
+RANKED_SEARCH_SQL = f"""
+    WITH wanted AS (
+        SELECT coalesce(array_agg(DISTINCT canonical_id), '{{}}') AS ids
+        FROM ingredient_list
+        WHERE name = ANY($1)
+    ), {_excluded_cte("$4", "$5")}, top AS (
+        SELECT r.meal_id, r.name, r.category, r.area, r.ingredient_ids,
+               s.matched, cardinality(r.ingredient_ids) - s.matched AS missing,
+               s.matched::float / cardinality(r.ingredient_ids) AS coverage
+        FROM (
+            SELECT ri.recipe_id, count(*) AS matched
+            FROM recipe_ingredients ri, wanted w
+            WHERE ri.ingredient_id = ANY(w.ids)
+            GROUP BY ri.recipe_id
+        ) s
+        JOIN recipes r ON r.meal_id = s.recipe_id
+        CROSS JOIN excluded x
+        WHERE ($2::integer IS NULL OR cardinality(r.ingredient_ids) - s.matched <= $2)
+          AND NOT r.ingredient_ids && x.ids
+        ORDER BY matched DESC, coverage DESC, missing, r.meal_id
+        LIMIT $3
+    )
+    SELECT t.meal_id, t.name, t.category, t.area, t.matched, t.missing,
+           ARRAY(
+               SELECT il.name FROM ingredient_list il
+               WHERE il.id = ANY(t.ingredient_ids) AND il.id <> ALL(w.ids)
+               ORDER BY il.name
+           )
+    FROM top t, wanted w
+    ORDER BY t.matched DESC, t.coverage DESC, t.missing, t.meal_id
+"""
+
+
+def rank_recipes_by_ingredients(cursor, ingredients, limit=RANKED_LIMIT, max_missing=None, index=None,
+                                exclude=()):
+    """Top recipes using the most of the given ingredients.
+
+    Returns (meal_id, name, category, area, matched, missing count, missing
+    ingredient names); max_missing drops recipes needing more than that many
+    other ingredients, and recipes using anything in `exclude` are skipped.
+    With a RecipeIndex the ranking runs in process.
+    """
+    normalized = sorted({canonical_name(i) for i in ingredients})
+    patterns, exclusion = _exclusion_params(exclude)
+    if index is not None:
+        return index.ranked(normalized, limit, max_missing, patterns)
+    execute_prepared(cursor, "rank_recipes", RANKED_SEARCH_SQL,
+                     [(normalized, "text[]"), (max_missing, "integer"), (limit, "integer")] + exclusion)
     return cursor.fetchall()
 
-def get_ingredients_from_api(meal_name):
-    """Fetch full recipe data from TheMealDB API"""
-    url = f"https://www.themealdb.com/api/json/v1/1/search.php?s={meal_name}"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-
-        meals = data.get("meals")
-        if not meals:
-            return None
-
-        meal = meals[0]
-
-        # Extract ingredients and measures
-        ingredients = []
-        for i in range(1, 21):
-            ingredient = meal.get(f"strIngredient{i}")
-            measure = meal.get(f"strMeasure{i}")
-            if ingredient and ingredient.strip():
-                normalized = ingredient.strip().lower()
-                ingredients.append((normalized, measure.strip() if measure else ""))
-
-        return {
-            "ingredients": ingredients,
-            "region": meal.get("strArea", "Unknown"),
-            "category": meal.get("strCategory", "Unknown"),
-            "instructions": meal.get("strInstructions", "No instructions found.")
-        }
 
-    except requests.RequestException as e:
-        print(f"API error: {e}")
-        return None
+# Assumed to be in every kitchen unless pantry search is told otherwise.
+PANTRY_STAPLES = (
+    "salt", "pepper", "water",
+    "oil", "olive oil", "vegetable oil", "sunflower oil", "rapeseed oil", "canola oil",
+)
+
+# Subset containment: recipes whose ingredient_ids array is contained in the
+# pantry's IDs, answered by the same GIN index as the all-ingredients search.
+PANTRY_SEARCH_SQL = f"""
+    WITH pantry AS (
+        SELECT coalesce(array_agg(canonical_id), '{{}}') AS ids
+        FROM ingredient_list
+        WHERE name = ANY($1)
+    ), {_excluded_cte("$2", "$3")}
+    SELECT r.meal_id, r.name, r.category, r.area
+    FROM recipes r, pantry p, excluded x
+    WHERE r.ingredient_ids <@ p.ids
+      AND NOT r.ingredient_ids && x.ids
+"""
+
+
+def find_recipes_from_pantry(cursor, ingredients, ignore_staples=True, index=None, exclude=()):
+    """Find recipes that use nothing but the given ingredients (plus PANTRY_STAPLES), minus `exclude`"""
+    pantry = set(ingredients)
+    if ignore_staples:
+        pantry.update(PANTRY_STAPLES)
+    normalized = sorted({canonical_name(i) for i in pantry})
+    patterns, exclusion = _exclusion_params(exclude)
+    if index is not None:
+        return index.pantry(normalized, patterns)
+    execute_prepared(cursor, "find_recipes_pantry", PANTRY_SEARCH_SQL, [(normalized, "text[]")] + exclusion)
+    return cursor.fetchall()
 
 
-def main():
-    """Main application loop"""
-    try:
-        with psycopg2.connect(
-            database=DATABASE,
-            user=USER,
-            password=PASSWORD,
-            host=HOST,
-            port=PORT,
-            # sslmode='require'
-        ) as connection:
-            with connection.cursor() as cursor:
-                create_tables(cursor)
-                preload_ingredient_cache(cursor)
-                load_recipes_by_category(cursor, connection)
-
-            while True:
-                user_input = input("Enter ingredients separated by commas: ").strip()
-                if not user_input:
-                    print("You must enter at least one ingredient.")
-                    continue
-
-                ingredients = [i.strip().lower() for i in user_input.split(",") if i.strip()]
-                if not ingredients:
-                    print("No valid ingredients detected. Please try again.")
-                    continue
-
-                with connection.cursor() as cursor:
-                    matched = find_recipes_by_ingredients(cursor, ingredients)
-
-                if not matched:
-                    print("\nNo matching recipes found.")
-                    retry = input("Try again? (Y to retry / Q to quit): ").strip().lower()
-                    if retry == 'q':
-                        print("Bye!")
-                        break
-                    elif retry == 'y':
-                        continue
+def get_recipe_detail(cursor, meal_id, index=None):
+    """Fetch a recipe with its ordered ingredient lines in one query"""
+    if index is not None:
+        return index.recipe_detail(meal_id)
+    cursor.execute("""
+        SELECT r.name, r.category, r.area, r.instructions,
+               r.thumbnail, r.tags, r.youtube, r.source,
+               il.name, l.measure
+        FROM recipes r
+        LEFT JOIN recipe_ingredient_lines l ON l.recipe_id = r.meal_id
+        LEFT JOIN ingredient_list il ON il.id = l.ingredient_id
+        WHERE r.meal_id = %s
+        ORDER BY l.position;
+    """, (meal_id,))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+
+    name, category, area, instructions, thumbnail, tags, youtube, source = rows[0][:8]
+    return {
+        "name": name,
+        "ingredients": [(ingredient, measure or "") for *_, ingredient, measure in rows if ingredient],
+        "region": area or "Unknown",
+        "category": category or "Unknown",
+        "instructions": instructions or "No instructions found.",
+        "thumbnail": thumbnail,
+        "tags": tags,
+        "youtube": youtube,
+        "source": source,
+    }
+
+
+def run_search(func, index=None):
+    """Run func(cursor) on a pooled connection, or without one for the local engine"""
+    if index is not None:
+        return func(None)
+    return run_read(func)
+
+
+def open_local_index(cache_file="recipes_cache.json"):
+    """Index the recipe snapshot in memory, rebuilding it if the JSON cache is newer; None if neither exists"""
+    if not snapshot_is_current(SNAPSHOT_FILE, cache_file) and os.path.exists(cache_file):
+        with open(cache_file, "r") as f:
+            build_snapshot(json.load(f), SNAPSHOT_FILE)
+    if not os.path.exists(SNAPSHOT_FILE):
+        return None
+    return RecipeIndex.from_snapshot(Snapshot(SNAPSHOT_FILE))
+
+
+# "without" as a whole word starts the exclusion list.
+WITHOUT = re.compile(r"\bwithout\b:?", re.IGNORECASE)
+
+# "category=Seafood" / "area=Japanese" anywhere in the input; a value ends
+# at a comma, at "without" or at the end of the line.
+FACET_FILTER = re.compile(r"\b(category|area)\s*=\s*(.*?)\s*(?=,|\bwithout\b|$)", re.IGNORECASE)
+
+
+def format_facets(facets):
+    """One line per facet: "Category: Seafood (4), Chicken (2)" """
+    return [f"{facet.title()}: {', '.join(f'{value} ({count})' for value, count in pairs)}"
+            for facet, pairs in facets.items() if pairs]
+
+
+def interactive_search(index=None):
+    """Prompt for ingredients and show matching recipes until the user quits"""
+    print("Tip: start with 'pantry:' to list recipes you can make from only those ingredients.")
+    print(f"Tip: end with 'without ...' to leave out ingredients or allergens ({', '.join(ALLERGEN_GROUPS)}).")
+    print("Tip: add 'category=...' or 'area=...' to narrow the results.")
+    # Narrowing re-runs the last query with a filter added; its expansions are reused.
+    pending = None
+    expanded = {}
+    while True:
+        if pending is None:
+            user_input = input("Enter ingredients separated by commas: ").strip()
+        else:
+            user_input, pending = pending, None
+        query = user_input
+        filters = {facet.lower(): value or None for facet, value in FACET_FILTER.findall(user_input)}
+        user_input = FACET_FILTER.sub("", user_input)
+        pantry_mode = user_input.lower().startswith("pantry:")
+        if pantry_mode:
+            user_input = user_input[len("pantry:"):].strip()
+        user_input, *without = WITHOUT.split(user_input.lower(), maxsplit=1)
+        exclude = [term.strip() for term in "".join(without).split(",") if term.strip()]
+        if not user_input:
+            print("You must enter at least one ingredient.")
+            continue
+
+        ingredients = [i.strip().lower() for i in user_input.split(",") if i.strip()]
+        if not ingredients:
+            print("No valid ingredients detected. Please try again.")
+            continue
+        if exclude:
+            print(f"  leaving out: {', '.join(exclude)}")
+        narrowed = [f"{facet}={value}" for facet, value in filters.items() if value]
+        if narrowed:
+            print(f"  narrowed to: {', '.join(narrowed)}")
+        if filters and pantry_mode:
+            print("  category/area filters apply to ingredient search, not pantry search")
+
+        terms = tuple(ingredients)
+        known = terms in expanded
+        if not known:
+            expanded = {terms: run_search(lambda cursor: expand_ingredient_terms(cursor, ingredients, index=index),
+                                          index)}
+        groups = []
+        for term, candidates in expanded[terms].items():
+            names = [name for name, _ in candidates]
+            if names != [term] and not known:
+                print(f"  {term} -> {', '.join(names) if names else 'no similar ingredient'}")
+            groups.append(names or [term])
+        # Pantry and ranked search take one ingredient per term: its best match.
+        best = [names[0] for names in groups]
+
+        if pantry_mode:
+            matched = run_search(lambda cursor: find_recipes_from_pantry(cursor, best, index=index, exclude=exclude),
+                                 index)
+            heading = "Recipes you can make with what you have (salt, pepper, water and oil assumed):"
+        facets = {}
+        if not pantry_mode:
+            matched, facets = run_search(
+                lambda cursor: search_recipes_faceted(cursor, groups, filters.get("category"), filters.get("area"),
+                                                      exclude, index), index)
+            heading = "Matching recipes:"
+        # Facet counts cover matches outside the filters too; rank only when there are none at all.
+        if not matched and not pantry_mode and not any(facets.values()):
+            matched = run_search(lambda cursor: rank_recipes_by_ingredients(cursor, best, index=index,
+                                                                            exclude=exclude), index)
+            heading = "No recipe uses all of them. Closest matches:"
+
+        if not matched:
+            print("\nNo matching recipes found.")
+            for line in format_facets(facets):
+                print(f"  {line}")
+            retry = input("Try again? (Y to retry / Q to quit / category=... or area=... to narrow): ").strip()
+            if retry.lower() == 'q':
+                print("Bye!")
+                break
+            elif FACET_FILTER.search(retry):
+                pending = f"{query}, {retry}"
+                continue
+            elif retry.lower() == 'y':
+                continue
+            else:
+                print("Invalid choice. Returning to input.")
+                continue
+
+        print(f"\n{heading}")
+        for i, row in enumerate(matched, start=1):
+            name, category, area = row[1:4]
+            line = f"{i}: {name} | Category: {category} | Area: {area}"
+            if len(row) > 4:
+                line += f" | Uses {row[4]} of yours, missing {row[5]}: {', '.join(row[6]) or 'nothing'}"
+            print(line)
+        for line in format_facets(facets):
+            print(line)
+
+        while True:
+            print("\nWould you like to see full recipe? Enter number, 'category=...'/'area=...' to narrow, or 'Q'")
+            choice = input("Your choice: ").strip().lower()
+
+            if choice == 'q':
+                print("Bye!")
+                return
+            elif FACET_FILTER.search(choice):
+                pending = f"{query}, {choice}"
+                break
+            elif choice.isdigit():
+                selected = int(choice) - 1
+                if 0 <= selected < len(matched):
+                    selected_meal_id, selected_meal_name = matched[selected][:2]
+                    recipe_data = run_search(lambda cursor: get_recipe_detail(cursor, selected_meal_id, index),
+                                             index)
+                    if recipe_data:
+                        print(f"\nFull recipe for: {selected_meal_name}")
+                        print(f"Region: {recipe_data['region']} | Category: {recipe_data['category']}")
+                        if recipe_data["tags"]:
+                            print(f"Tags: {recipe_data['tags']}")
+                        print("\nIngredients:")
+                        for ingredient, measure in recipe_data["ingredients"]:
+                            print(f"- {ingredient}: {measure}")
+                        print("\nInstructions:")
+                        print(recipe_data["instructions"])
+                        if recipe_data["source"]:
+                            print(f"\nSource: {recipe_data['source']}")
+                        print("Bon appetit!")
+                        return
                     else:
-                        print("Invalid choice. Returning to input.")
-                        continue
+                        print("Recipe not found in database.")
+                else:
+                    print("Invalid number. Please choose from the list.")
+            else:
+                print("Invalid input. Please enter a number or 'Q'.")
+
+
+def ingest(args):
+    """Create tables, crawl or sync the catalog and load it into the database"""
+    start = time.perf_counter()
+    with get_connection() as connection:
+        with connection.cursor() as cursor:
+            create_tables(cursor)
+            preload_ingredient_cache(cursor)
+            reset_stats()
+            failed = load_recipes_by_category(cursor, connection, workers=args.workers, sync=args.sync,
+                                              strategy=args.strategy, force=args.force)
+    if request_count():
+        # Per-endpoint totals for this run only, including list.php and every retry.
+        print(f"{request_count()} API requests this run")
+        print_stats()
+    if failed:
+        print(f"Ingest incomplete: {len(failed)} API requests failed ({', '.join(failed[:10])}"
+              f"{', ...' if len(failed) > 10 else ''}). The cache and database were left unchanged; "
+              "run it again to fetch only the missing records.")
+        sys.exit(1)
+    print(f"Ingest finished in {time.perf_counter() - start:.2f}s "
+          f"({time.perf_counter() - PROCESS_START:.2f}s since start)")
+
+
+def check_schema(connection):
+    """Warn when the database needs an ingest first; search never changes the schema"""
+    with connection.cursor() as cursor:
+        version = applied_version(cursor)
+    if version < LATEST_VERSION:
+        print(f"\nDatabase schema is at version {version} of {LATEST_VERSION}. "
+              "Run 'python DinnerPlaner.py ingest' to create or upgrade it.")
+
+
+def search(args):
+    """Query-only mode: warm the connection pool in the background and go straight to the prompt"""
+    if args.local:
+        index = open_local_index()
+        if index is None:
+            print("No recipe snapshot found. Run 'python DinnerPlaner.py ingest' first.")
+            return
+        with index:
+            print(f"Ready in {(time.perf_counter() - PROCESS_START) * 1000:.0f} ms "
+                  f"({len(index.recipes)} recipes indexed in memory)")
+            interactive_search(index)
+        return
+
+    # One round trip wakes the compute; repeating it would keep Neon from
+    # suspending an idle session, so that only happens with --warmup.
+    start_warmup(WARMUP_INTERVAL if args.warmup else None, setup=check_schema)
+    print(f"Ready in {(time.perf_counter() - PROCESS_START) * 1000:.0f} ms")
+    try:
+        interactive_search()
+    except psycopg2.errors.UndefinedTable:
+        print("Recipe tables not found. Run 'python DinnerPlaner.py ingest' first.")
+    except (psycopg2.errors.UndefinedColumn, psycopg2.errors.UndefinedFunction, psycopg2.errors.UndefinedObject):
+        print("Recipe database is out of date. Run 'python DinnerPlaner.py ingest' to upgrade it.")
+    finally:
+        if args.stats:
+            print_pool_stats()
+        close_pool()
 
-                print("\nMatching recipes:")
-                for i, row in enumerate(matched, start=1):
-                    name, category, area = row
-                    print(f"{i}: {name} | Category: {category} | Area: {area}")
 
-                while True:
-                    print("\nWould you like to see full recipe? Enter number or 'Q' to quit")
-                    choice = input("Your choice: ").strip().lower()
+def main():
+    """Main application loop"""
+    parser = argparse.ArgumentParser(description="Find recipes by the ingredients you have.")
+    commands = parser.add_subparsers(dest="command")
+    search_parser = commands.add_parser("search", help="search recipes (default)")
+    search_parser.add_argument("--stats", action="store_true",
+                               help="print database connect/acquire latency on exit")
+    search_parser.add_argument("--local", action="store_true",
+                               help="search an in-memory index of recipes.snap instead of the database")
+    search_parser.add_argument("--warmup", action="store_true",
+                               help=f"keep the database awake with a ping every {WARMUP_INTERVAL} s while idle")
+    ingest_parser = commands.add_parser("ingest", aliases=["sync"],
+                                        help="crawl TheMealDB and load the catalog")
+    ingest_parser.add_argument("--sync", action="store_true",
+                               help="incrementally refresh the cache instead of reusing it")
+    ingest_parser.add_argument("--workers", type=int, default=CRAWL_WORKERS)
+    ingest_parser.add_argument("--strategy", choices=["category", "letter"], default="category",
+                               help="how a cold crawl walks the API")
+    ingest_parser.add_argument("--force", action="store_true",
+                               help="reload even if the catalog fingerprint is unchanged")
+    args = parser.parse_args()
+    if args.command == "sync":
+        args.sync = True
+    if args.command is None:
+        args.stats = False
+        args.local = False
+        args.warmup = False
 
-                    if choice == 'q':
-                        print("Bye!")
-                        return
-                    elif choice.isdigit():
-                        index = int(choice) - 1
-                        if 0 <= index < len(matched):
-                            selected_meal_name = matched[index][0]
-                            recipe_data = get_ingredients_from_api(selected_meal_name)
-                            if recipe_data:
-                                print(f"\nFull recipe for: {selected_meal_name}")
-                                print(f"Region: {recipe_data['region']} | Category: {recipe_data['category']}")
-                                print("\nIngredients:")
-                                for ingredient, measure in recipe_data["ingredients"]:
-                                    print(f"- {ingredient}: {measure}")
-                                print("\nInstructions:")
-                                print(recipe_data["instructions"])
-                                print("Bon appetit!")
-                                return
-                            else:
-                                print("Recipe not found in API.")
-                        else:
-                            print("Invalid number. Please choose from the list.")
-                    else:
-                        print("Invalid input. Please enter a number or 'Q'.")
+    try:
+        if args.command in ("ingest", "sync"):
+            ingest(args)
+        else:
+            search(args)
     except psycopg2.Error as e:
         print(f"Database connection error: {e}")
 
@@ -0,0 +1,76 @@
+"""Named allergen groups and exclusion patterns for ingredient search.
+
+A group is a set of keywords matched as whole words against canonical
+ingredient names, minus phrases that contain a keyword without containing
+the allergen ("coconut milk", "butter bean"). Patterns only use syntax that
+both Python's re and PostgreSQL regular expressions understand, so the
+in-process index and the database exclude exactly the same ingredients.
+"""
+import re
+
+from canonical import canonical_name
+
+ALLERGEN_GROUPS = {
+    "nuts": (
+        ("almond", "cashew", "walnut", "pecan", "hazelnut", "hazlenut", "pistachio", "peanut",
+         "macadamia", "brazil nut", "pine nut", "chestnut", "nut", "praline", "marzipan", "nutella"),
+        ("water chestnut", "chestnut mushroom"),
+    ),
+    "dairy": (
+        ("milk", "butter", "buttermilk", "cheese", "cream", "yogurt", "yoghurt", "creme fraiche",
+         "ghee", "mozzarella", "parmesan", "parmigiano", "cheddar", "ricotta", "mascarpone", "feta",
+         "paneer", "brie", "gruyere", "halloumi", "stilton", "gouda", "emmental", "pecorino",
+         "custard", "whey"),
+        ("coconut milk", "almond milk", "soya milk", "soy milk", "oat milk", "rice milk",
+         "peanut butter", "almond butter", "vegan butter", "butter bean", "coconut cream",
+         "cream of tartar", "cocoa butter", "custard powder", "vegan"),
+    ),
+    "gluten": (
+        ("flour", "wheat", "barley", "rye", "bread", "breadcrumb", "pasta", "spaghetti", "penne",
+         "rigatoni", "macaroni", "linguine", "fettuccine", "tagliatelle", "lasagne", "lasagna",
+         "noodle", "couscous", "bulgur", "semolina", "tortilla", "pitta", "pita", "naan", "bun",
+         "biscuit", "pastry", "cracker", "crouton", "beer", "ale", "soy sauce", "seitan", "udon",
+         "orzo", "farfalle", "fusilli", "ravioli", "tortellini", "gnocchi", "panko", "muffin",
+         "bagel", "brioche", "ciabatta", "baguette", "croissant", "filo", "phyllo", "malt"),
+        ("rice flour", "corn flour", "gram flour", "almond flour", "coconut flour", "rice noodle",
+         "rice stick noodle", "glass noodle", "rice vermicelli", "corn tortilla", "gluten-free"),
+    ),
+    "shellfish": (
+        ("prawn", "shrimp", "crab", "lobster", "crayfish", "langoustine", "mussel", "clam",
+         "oyster", "scallop", "cockle", "whelk", "squid", "calamari", "octopus"),
+        ("oyster mushroom",),
+    ),
+}
+
+ALLERGEN_ALIASES = {"nut": "nuts", "tree nuts": "nuts", "lactose": "dairy", "crustaceans": "shellfish"}
+
+
+def word_pattern(phrases):
+    """Regex matching any phrase as whole words, with an optional plural ending"""
+    alternatives = "|".join(re.escape(phrase) for phrase in sorted(phrases))
+    return f"(^|[^a-z])({alternatives})(e?s)?([^a-z]|$)"
+
+
+def exclusion_patterns(terms):
+    """(pattern, exception pattern or None) pairs for a list of exclusion terms.
+
+    A term naming an allergen group excludes the whole group; any other
+    term excludes every ingredient that contains it as whole words, so
+    "peanut" also rules out peanut butter and peanut oil.
+    """
+    patterns = []
+    for term in terms:
+        key = term.strip().lower()
+        key = ALLERGEN_ALIASES.get(key, key)
+        if key in ALLERGEN_GROUPS:
+            keywords, exceptions = ALLERGEN_GROUPS[key]
+            patterns.append((word_pattern(keywords), word_pattern(exceptions) if exceptions else None))
+        elif key:
+            patterns.append((word_pattern([canonical_name(key)]), None))
+    return patterns
+
+
+def matches_exclusion(name, patterns):
+    """True if an ingredient name is ruled out by any (pattern, exception) pair"""
+    return any(re.search(pattern, name) and not (exception and re.search(exception, name))
+               for pattern, exception in patterns)
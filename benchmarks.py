@@ -0,0 +1,418 @@
+"""Benchmarks for the DinnerPlaner crawl, load and search paths.
+
+Run one with: python benchmarks.py <benchmark> [options]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+
+import psycopg2.extensions
+
+import DinnerPlaner
+import mealdb_client
+import mock_mealdb
+from bulk_load import bulk_load_snapshot
+from crawler import CRAWL_WORKERS, crawl_all_meals, crawl_by_first_letter
+from db_pool import SearchConnection
+from ngram_index import NgramIndex
+from recipe_index import RecipeIndex
+from DinnerPlaner import get_all_categories, get_connection
+from snapshot import Snapshot, build_snapshot
+
+
+def bench_crawl(args):
+    """Compare request count and wall-clock time of the two crawl strategies"""
+    mealdb_client.CACHE_ENABLED = False
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        strategies = [
+            ("category", lambda: crawl_all_meals(
+                get_all_categories(), workers=args.workers,
+                checkpoint_file=os.path.join(tmp, "checkpoint.jsonl"))),
+            ("letter", lambda: crawl_by_first_letter(
+                get_all_categories(), workers=args.workers,
+                checkpoint_file=os.path.join(tmp, "letter-checkpoint.jsonl"))),
+        ]
+        for name, crawl in strategies:
+            mealdb_client.reset_stats()
+            start = time.perf_counter()
+            meals, failed = crawl()
+            if failed:
+                print(f"{name}: {len(failed)} requests failed after retries")
+            results.append((name, len(meals), mealdb_client.request_count(), time.perf_counter() - start))
+
+    print(f"\n{'strategy':<10} {'meals':>6} {'requests':>9} {'wall (s)':>9}")
+    for name, meal_count, request_count, elapsed in results:
+        print(f"{name:<10} {meal_count:>6} {request_count:>9} {elapsed:>9.2f}")
+
+
+def _best_of(repeat, func):
+    """Best wall-clock time of several runs, in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def bench_snapshot(args):
+    """Compare startup load time of recipes_cache.json and the binary snapshot"""
+    cache_file = "recipes_cache.json"
+    with open(cache_file, "r") as f:
+        meals = json.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_file = os.path.join(tmp, "recipes.snap")
+        build_snapshot(meals, snapshot_file)
+        probe = "chicken"
+
+        def json_full():
+            with open(cache_file, "r") as f:
+                json.load(f)
+
+        def json_lookup():
+            with open(cache_file, "r") as f:
+                loaded = json.load(f)
+            [meal["idMeal"] for meal in loaded
+             if any((meal.get(f"strIngredient{i}") or "").strip().lower() == probe for i in range(1, 21))]
+
+        def snapshot_open():
+            Snapshot(snapshot_file).close()
+
+        def snapshot_lookup():
+            with Snapshot(snapshot_file) as snapshot:
+                [snapshot.meal_id(i) for i in snapshot.recipes_with_ingredient(snapshot.ingredient_index(probe))]
+
+        def snapshot_full():
+            with Snapshot(snapshot_file) as snapshot:
+                list(snapshot.iter_meals())
+
+        rows = [
+            ("json.load", json_full),
+            ("json.load + ingredient scan", json_lookup),
+            ("snapshot open", snapshot_open),
+            ("snapshot open + ingredient lookup", snapshot_lookup),
+            ("snapshot full decode", snapshot_full),
+        ]
+        print(f"recipes_cache.json: {os.path.getsize(cache_file)} bytes, "
+              f"snapshot: {os.path.getsize(snapshot_file)} bytes")
+        print(f"\n{'operation':<36} {'best (ms)':>10}")
+        for name, func in rows:
+            print(f"{name:<36} {_best_of(args.repeat, func):>10.2f}")
+
+
+class CountingCursor(psycopg2.extensions.cursor):
+    """Cursor that counts statements sent to the server"""
+    statements = 0
+
+    def execute(self, query, vars=None):
+        CountingCursor.statements += 1
+        return super().execute(query, vars)
+
+    def copy_expert(self, sql, file, size=8192):
+        CountingCursor.statements += 1
+        return super().copy_expert(sql, file, size)
+
+
+@contextmanager
+def _scratch_schema(connection):
+    """Yield a cursor on empty tables in a throwaway schema.
+
+    Everything happens in one transaction that is rolled back, so the real
+    tables are never touched. public stays on the search path for
+    extensions an ingest installed there (pg_trgm's gin_trgm_ops).
+    """
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE SCHEMA dinnerplaner_bench; SET LOCAL search_path TO dinnerplaner_bench, public;")
+            DinnerPlaner.create_tables(cursor)
+            DinnerPlaner.ingredient_cache.clear()
+            yield cursor
+    finally:
+        connection.rollback()
+        DinnerPlaner.ingredient_cache.clear()
+
+
+def _in_scratch_schema(connection, func):
+    """Run func(cursor) in a scratch schema; returns (statements, milliseconds)"""
+    with _scratch_schema(connection) as cursor:
+        CountingCursor.statements = 0
+        start = time.perf_counter()
+        func(cursor)
+        return CountingCursor.statements, (time.perf_counter() - start) * 1000
+
+
+def _snapshot_file(tmp):
+    """Build a snapshot of recipes_cache.json in a temp dir"""
+    with open("recipes_cache.json", "r") as f:
+        meals = json.load(f)
+    path = os.path.join(tmp, "recipes.snap")
+    build_snapshot(meals, path)
+    return path
+
+
+def bench_load(args):
+    """Compare the per-row and COPY-based catalog loaders on empty tables"""
+    with tempfile.TemporaryDirectory() as tmp, Snapshot(_snapshot_file(tmp)) as snapshot:
+        connection = get_connection(cursor_factory=CountingCursor)
+        try:
+            rows = [
+                ("per-row", lambda cursor: DinnerPlaner.load_snapshot(cursor, snapshot)),
+                ("COPY + merge", lambda cursor: bulk_load_snapshot(cursor, snapshot)),
+            ]
+            print(f"{'loader':<14} {'statements':>10} {'wall (ms)':>10}")
+            for name, func in rows:
+                statements, elapsed = _in_scratch_schema(connection, func)
+                print(f"{name:<14} {statements:>10} {elapsed:>10.1f}")
+        finally:
+            connection.close()
+
+
+def _adhoc_search(ingredients):
+    """The original search: an IN list whose shape changes with the input"""
+    normalized = [i.strip().lower() for i in ingredients]
+    placeholders = ','.join(['%s'] * len(normalized))
+    sql = f"""
+        SELECT r.meal_id, r.name, r.category, r.area
+        FROM recipes r
+        JOIN recipe_ingredients ri ON r.meal_id = ri.recipe_id
+        JOIN ingredient_list il ON ri.ingredient_id = il.id
+        WHERE il.name IN ({placeholders})
+        GROUP BY r.meal_id, r.name, r.category, r.area
+        HAVING COUNT(DISTINCT il.name) = %s
+    """
+    return sql, normalized + [len(normalized)]
+
+
+def _find_recipes_unprepared(cursor, ingredients):
+    cursor.execute(*_adhoc_search(ingredients))
+    return cursor.fetchall()
+
+
+def _sample_queries(cursor, count, seed=7):
+    """Random 1-5 ingredient queries drawn from the loaded vocabulary"""
+    cursor.execute("SELECT name FROM ingredient_list ORDER BY name;")
+    vocabulary = [row[0] for row in cursor.fetchall()]
+    rng = random.Random(seed)
+    return [rng.sample(vocabulary, rng.randint(1, 5)) for _ in range(count)]
+
+
+def _explain(cursor, query, params):
+    """The top-level EXPLAIN ANALYZE JSON document for a statement"""
+    cursor.execute(f"EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) {query}", params)
+    return cursor.fetchone()[0][0]
+
+
+def _planning_ms(cursor, query, params):
+    """Planning Time reported by EXPLAIN ANALYZE for a statement"""
+    return _explain(cursor, query, params)["Planning Time"]
+
+
+def bench_prepared(args):
+    """Compare per-query latency and planning time of ad-hoc vs prepared search"""
+    connection = get_connection(connection_factory=SearchConnection)
+    connection.autocommit = True
+    try:
+        with connection.cursor() as cursor:
+            queries = _sample_queries(cursor, args.queries)
+            rows = [
+                ("ad-hoc IN list", _find_recipes_unprepared),
+                ("prepared ANY($1)", DinnerPlaner.find_recipes_by_ingredients),
+            ]
+            print(f"{'search':<18} {'avg (ms)':>9} {'p95 (ms)':>9}")
+            for name, find in rows:
+                find(cursor, queries[0])
+                timings = []
+                for ingredients in queries:
+                    start = time.perf_counter()
+                    find(cursor, ingredients)
+                    timings.append((time.perf_counter() - start) * 1000)
+                timings.sort()
+                print(f"{name:<18} {sum(timings) / len(timings):>9.2f} "
+                      f"{timings[int(len(timings) * 0.95) - 1]:>9.2f}")
+
+            sample = queries[:20]
+            adhoc = [_planning_ms(cursor, *_adhoc_search(q)) for q in sample]
+            prepared = [_planning_ms(cursor, "EXECUTE find_recipes_all (%s, %s, %s)", (sorted(set(q)), [], []))
+                        for q in sample]
+            print(f"\nplanning time, ad-hoc:   {sum(adhoc) / len(adhoc):.3f} ms/query")
+            print(f"planning time, prepared: {sum(prepared) / len(prepared):.3f} ms/query")
+    finally:
+        connection.close()
+
+
+# The GROUP BY/HAVING join that containment search replaced.
+JOIN_SEARCH_SQL = """
+    SELECT r.meal_id, r.name, r.category, r.area
+    FROM recipes r
+    JOIN recipe_ingredients ri ON r.meal_id = ri.recipe_id
+    JOIN ingredient_list il ON ri.ingredient_id = il.id
+    WHERE il.name = ANY($1)
+    GROUP BY r.meal_id, r.name, r.category, r.area
+    HAVING COUNT(DISTINCT il.name) = cardinality($1)
+"""
+
+
+def _generate_catalog(cursor, recipe_count, vocabulary=600, per_recipe=10):
+    """Fill scratch tables with synthetic recipes.
+
+    Ingredient popularity is skewed towards low IDs, like a real pantry
+    where salt and onions are everywhere and saffron is rare.
+    """
+    cursor.execute("""
+        INSERT INTO ingredient_list (name)
+        SELECT 'ingredient ' || g FROM generate_series(1, %(vocabulary)s) g;
+        UPDATE ingredient_list SET canonical_id = id;
+
+        INSERT INTO recipes (meal_id, name, category, area)
+        SELECT g, 'recipe ' || g, 'Synthetic', 'Synthetic'
+        FROM generate_series(1, %(recipes)s) g;
+
+        INSERT INTO recipe_ingredients (recipe_id, ingredient_id)
+        SELECT DISTINCT r.g, 1 + floor(%(vocabulary)s * power(random(), 2))::int
+        FROM generate_series(1, %(recipes)s) r(g)
+        CROSS JOIN generate_series(1, %(per_recipe)s) k;
+    """, {"vocabulary": vocabulary, "recipes": recipe_count, "per_recipe": per_recipe})
+    DinnerPlaner.refresh_ingredient_arrays(cursor, range(1, recipe_count + 1))
+    cursor.execute("ANALYZE recipes; ANALYZE recipe_ingredients; ANALYZE ingredient_list;")
+
+
+def _execution_ms(cursor, sql, names):
+    """Server-side execution time of a search on names ($1), with no exclusions ($2, $3) if it takes any"""
+    query = (sql.replace("%", "%%").replace("$1", "%(names)s::text[]")
+             .replace("$2", "%(none)s::text[]").replace("$3", "%(none)s::text[]"))
+    return _explain(cursor, query, {"names": names, "none": []})["Execution Time"]
+
+
+def bench_gin(args):
+    """Compare the GROUP BY join with GIN array containment as the catalog grows"""
+    rng = random.Random(7)
+    connection = get_connection()
+    try:
+        print(f"{'recipes':>8} {'join (ms)':>10} {'@> (ms)':>10}")
+        for size in args.sizes or [300, 10000, 100000]:
+            with _scratch_schema(connection) as cursor:
+                _generate_catalog(cursor, size)
+                queries = [[f"ingredient {i}" for i in rng.sample(range(1, 60), rng.randint(2, 3))]
+                           for _ in range(args.repeat)]
+                join = [_execution_ms(cursor, JOIN_SEARCH_SQL, q) for q in queries]
+                gin = [_execution_ms(cursor, DinnerPlaner.FIND_ALL_INGREDIENTS_SQL, q) for q in queries]
+            print(f"{size:>8} {sum(join) / len(join):>10.2f} {sum(gin) / len(gin):>10.2f}")
+    finally:
+        connection.close()
+
+
+def _synthetic_postings(recipe_count, vocabulary=600, per_recipe=10, seed=7):
+    """Recipe indices per ingredient for a skewed synthetic catalog (see _generate_catalog)"""
+    rng = random.Random(seed)
+    postings = [[] for _ in range(vocabulary)]
+    for recipe in range(recipe_count):
+        for ingredient in {int(vocabulary * rng.random() ** 2) for _ in range(per_recipe)}:
+            postings[ingredient].append(recipe)
+    return postings
+
+
+def bench_index(args):
+    """Build time and query latency of the in-memory bitmap index vs Python sets.
+
+    "ranked" is a top-10 partial match for an 8-item pantry, "pantry" a
+    makeable-from-only-these search for a 40-item pantry, "facets" the AND
+    narrowed to one category with counts for every category and area.
+    """
+    rng = random.Random(7)
+    print(f"{'recipes':>8} {'build (ms)':>11} {'AND (us)':>9} {'AND+rows (us)':>14} {'sets (us)':>10} "
+          f"{'matches':>8} {'ranked (ms)':>12} {'pantry (ms)':>12} {'facets (ms)':>12}")
+    for size in args.sizes or [300, 100000, 1000000]:
+        postings = _synthetic_postings(size)
+        names = [f"ingredient {i}" for i in range(len(postings))]
+        recipes = [(i, f"recipe {i}", f"category {i % 14}", f"area {i % 27}") for i in range(size)]
+        start = time.perf_counter()
+        index = RecipeIndex(recipes, names, postings)
+        build_ms = (time.perf_counter() - start) * 1000
+        sets = [set(p) for p in postings]
+        queries = [rng.sample(range(60), rng.randint(2, 3)) for _ in range(args.queries)]
+        pantries = [[names[i] for i in rng.sample(range(200), 8)] for _ in range(args.queries)]
+        big_pantries = [[names[i] for i in rng.sample(range(200), 40)] for _ in range(args.queries)]
+
+        def per_query_us(search, inputs=queries):
+            start = time.perf_counter()
+            for q in inputs:
+                search(q)
+            return (time.perf_counter() - start) * 1e6 / len(inputs)
+
+        and_us = per_query_us(index.all_of)
+        rows_us = per_query_us(lambda q: index.rows(index.all_of(q)))
+        sets_us = per_query_us(lambda q: [recipes[i] for i in sorted(set.intersection(*(sets[i] for i in q)))])
+        matches = sum(index.all_of(q).bit_count() for q in queries) / len(queries)
+        ranked_ms = per_query_us(index.ranked, pantries) / 1000
+        pantry_ms = per_query_us(index.pantry, big_pantries) / 1000
+        facets_ms = per_query_us(lambda q: index.faceted([[names[i]] for i in q], category="category 3")) / 1000
+        print(f"{size:>8} {build_ms:>11.1f} {and_us:>9.1f} {rows_us:>14.1f} {sets_us:>10.1f} {matches:>8.0f} "
+              f"{ranked_ms:>12.2f} {pantry_ms:>12.2f} {facets_ms:>12.2f}")
+
+
+FUZZY_TERMS = ("chicken", "tomatoe", "egg", "garlic", "chiken breast", "parmesan", "oil", "soy", "mozzarela", "cinamon")
+
+
+def bench_fuzzy(args):
+    """Per-term latency of trigram ingredient expansion, in process and in Postgres"""
+    with tempfile.TemporaryDirectory() as tmp, Snapshot(_snapshot_file(tmp)) as snapshot:
+        start = time.perf_counter()
+        ngrams = NgramIndex(snapshot.ingredient_names())
+        build_ms = (time.perf_counter() - start) * 1000
+    local_ms = _best_of(args.repeat, lambda: [ngrams.search(term) for term in FUZZY_TERMS]) / len(FUZZY_TERMS)
+
+    query = (DinnerPlaner.EXPAND_TERMS_SQL.replace("%", "%%")
+             .replace("$1", "%(terms)s::text[]").replace("$2", "%(limit)s"))
+    connection = get_connection()
+    connection.autocommit = True
+    try:
+        with connection.cursor() as cursor:
+            server = [_explain(cursor, query, {"terms": [term], "limit": DinnerPlaner.EXPANSION_LIMIT})["Execution Time"]
+                      for term in FUZZY_TERMS]
+    finally:
+        connection.close()
+    print(f"n-gram index build: {build_ms:.2f} ms for {len(ngrams.names)} names")
+    print(f"in-process lookup:  {local_ms:.3f} ms/term")
+    print(f"pg_trgm lookup:     {sum(server) / len(server):.3f} ms/term (server execution)")
+
+
+BENCHMARKS = {
+    "crawl": bench_crawl,
+    "fuzzy": bench_fuzzy,
+    "gin": bench_gin,
+    "index": bench_index,
+    "load": bench_load,
+    "prepared": bench_prepared,
+    "snapshot": bench_snapshot,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--workers", type=int, default=CRAWL_WORKERS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")],
+                        help="comma-separated synthetic catalog sizes")
+    parser.add_argument("--local", action="store_true",
+                        help="run against a local TheMealDB stand-in instead of the live API")
+    parser.add_argument("--latency", type=float, default=0.0, help="stand-in latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="stand-in 503 rate")
+    args = parser.parse_args()
+
+    if args.local:
+        server, mealdb_client.API_URL = mock_mealdb.start_server(
+            port=0, latency=args.latency, error_rate=args.error_rate)
+        print(f"Using local stand-in at {mealdb_client.API_URL}")
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import io
+
+from canonical import canonical_name
+
+
+def _copy_value(value):
+    """Encode a value for COPY's text format"""
+    if value is None:
+        return "\\N"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def copy_rows(cursor, table, columns, rows):
+    """Stream rows into a table with a single COPY ... FROM STDIN"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+
+def bulk_load_snapshot(cursor, snapshot):
+    """Load a snapshot with COPY into staging tables and set-based merges.
+
+    Runs in a handful of statements regardless of catalog size. Every
+    recipe in the snapshot is upserted and its ingredient lines, links and
+    ingredient_ids array are rewritten, so a reload also picks up changed
+    recipes. Ingredient lines keep the raw names; links and arrays use the
+    canonical IDs. Staging tables are dropped on commit.
+    """
+    cursor.execute("""
+        CREATE TEMP TABLE staging_recipes (
+            meal_id INTEGER,
+            name TEXT,
+            category TEXT,
+            area TEXT,
+            instructions TEXT,
+            thumbnail TEXT,
+            tags TEXT,
+            youtube TEXT,
+            source TEXT
+        ) ON COMMIT DROP;
+        CREATE TEMP TABLE staging_ingredients (
+            ingredient_index INTEGER,
+            name TEXT,
+            canonical TEXT
+        ) ON COMMIT DROP;
+        CREATE TEMP TABLE staging_recipe_ingredients (
+            recipe_id INTEGER,
+            ingredient_index INTEGER,
+            position SMALLINT,
+            measure TEXT
+        ) ON COMMIT DROP;
+    """)
+
+    copy_rows(cursor, "staging_recipes",
+              ("meal_id", "name", "category", "area", "instructions",
+               "thumbnail", "tags", "youtube", "source"),
+              snapshot.iter_recipe_rows())
+    copy_rows(cursor, "staging_ingredients", ("ingredient_index", "name", "canonical"),
+              ((i, name, canonical_name(name)) for i, name in enumerate(snapshot.ingredient_names())))
+    copy_rows(cursor, "staging_recipe_ingredients", ("recipe_id", "ingredient_index", "position", "measure"),
+              snapshot.iter_recipe_ingredients())
+
+    cursor.execute("""
+        INSERT INTO recipes (meal_id, name, category, area, instructions,
+                             thumbnail, tags, youtube, source)
+        SELECT meal_id, name, category, area, instructions,
+               thumbnail, tags, youtube, source
+        FROM staging_recipes
+        ON CONFLICT (meal_id) DO UPDATE
+        SET name = EXCLUDED.name,
+            category = EXCLUDED.category,
+            area = EXCLUDED.area,
+            instructions = EXCLUDED.instructions,
+            thumbnail = EXCLUDED.thumbnail,
+            tags = EXCLUDED.tags,
+            youtube = EXCLUDED.youtube,
+            source = EXCLUDED.source;
+
+        INSERT INTO ingredient_list (name)
+        SELECT DISTINCT canonical FROM staging_ingredients
+        ON CONFLICT (name) DO NOTHING;
+
+        UPDATE ingredient_list il
+        SET canonical_id = il.id
+        FROM staging_ingredients si
+        WHERE il.name = si.canonical AND il.canonical_id IS DISTINCT FROM il.id;
+
+        INSERT INTO ingredient_list (name, canonical_id)
+        SELECT si.name, c.id
+        FROM staging_ingredients si
+        JOIN ingredient_list c ON c.name = si.canonical
+        ON CONFLICT (name) DO UPDATE
+        SET canonical_id = EXCLUDED.canonical_id
+        WHERE ingredient_list.canonical_id IS DISTINCT FROM EXCLUDED.canonical_id;
+
+        DELETE FROM recipe_ingredient_lines l
+        USING staging_recipes sr
+        WHERE l.recipe_id = sr.meal_id;
+
+        DELETE FROM recipe_ingredients ri
+        USING staging_recipes sr
+        WHERE ri.recipe_id = sr.meal_id;
+
+        INSERT INTO recipe_ingredient_lines (recipe_id, position, ingredient_id, measure)
+        SELECT sri.recipe_id, sri.position, il.id, sri.measure
+        FROM staging_recipe_ingredients sri
+        JOIN staging_ingredients si ON si.ingredient_index = sri.ingredient_index
+        JOIN ingredient_list il ON il.name = si.name;
+
+        INSERT INTO recipe_ingredients (recipe_id, ingredient_id)
+        SELECT DISTINCT l.recipe_id, il.canonical_id
+        FROM recipe_ingredient_lines l
+        JOIN ingredient_list il ON il.id = l.ingredient_id
+        JOIN staging_recipes sr ON sr.meal_id = l.recipe_id;
+
+        UPDATE recipes r
+        SET ingredient_ids = agg.ids
+        FROM (
+            SELECT ri.recipe_id, array_agg(ri.ingredient_id ORDER BY ri.ingredient_id) AS ids
+            FROM recipe_ingredients ri
+            JOIN staging_recipes sr ON sr.meal_id = ri.recipe_id
+            GROUP BY ri.recipe_id
+        ) agg
+        WHERE r.meal_id = agg.recipe_id;
+    """)
@@ -0,0 +1,126 @@
+"""Ingredient canonicalization: map raw ingredient text to one canonical name.
+
+Applied at ingest (every raw name is stored with the ID of its canonical
+name) and to search input, so "Fresh Basil", "basil leaves" and "basil" are
+one ingredient. The rules are deliberately conservative: a missed merge
+only costs recall, a wrong one returns the wrong recipes. Bump
+LOADER_VERSION in DinnerPlaner.py when the rules or tables change, so the
+next ingest re-canonicalizes the catalog.
+"""
+import re
+
+# Leading words that describe the state or size of an ingredient, not what it
+# is. "chopped", "diced" and "minced" are left out: chopped tomatoes are
+# tinned and minced beef is not stewing beef, so those get SYNONYMS entries.
+DESCRIPTORS = {
+    "fresh", "freshly", "sliced", "grated", "shredded", "crushed",
+    "large", "small", "medium", "free-range", "boneless", "skinless", "ripe", "raw", "cooked",
+}
+
+# Words that end in "s" without being plural.
+NOT_PLURAL = {
+    "asparagus", "couscous", "hummus", "molasses", "swiss", "cress", "bass", "hibiscus",
+    "citrus", "octopus", "gas", "brussels", "grits", "lemongrass", "krispies", "fries",
+}
+
+IRREGULAR_PLURALS = {
+    "leaves": "leaf",
+    "halves": "half",
+    "loaves": "loaf",
+    "knives": "knife",
+    "teeth": "tooth",
+    "chillies": "chilli",
+    "cookies": "cookie",
+    "tomatos": "tomato",
+}
+
+# Spelling variants and regional names, keyed and valued by singular forms.
+SYNONYMS = {
+    "aubergine": "eggplant",
+    "egg plant": "eggplant",
+    "zucchini": "courgette",
+    "cilantro": "coriander",
+    "scallion": "spring onion",
+    "green onion": "spring onion",
+    "ground beef": "beef mince",
+    "minced beef": "beef mince",
+    "lean minced beef": "beef mince",
+    "mince": "beef mince",
+    "ground pork": "pork mince",
+    "minced pork": "pork mince",
+    "minced lamb": "lamb mince",
+    "tinned tomato": "canned tomato",
+    "chopped tomato": "canned tomato",
+    "diced tomato": "canned tomato",
+    "chopped onion": "onion",
+    "chopped parsley": "parsley",
+    "minced garlic": "garlic",
+    "chili": "chilli",
+    "chile": "chilli",
+    "shrimp": "prawn",
+    "king prawn": "prawn",
+    "garbanzo bean": "chickpea",
+    "baking soda": "bicarbonate of soda",
+    "heavy cream": "double cream",
+    "powdered sugar": "icing sugar",
+    "confectioners sugar": "icing sugar",
+    "arugula": "rocket",
+    "all-purpose flour": "plain flour",
+    "garlic clove": "garlic",
+    "clove garlic": "garlic",
+    "extra virgin olive oil": "olive oil",
+    "sesame seed oil": "sesame oil",
+    "sea salt": "salt",
+    "kosher salt": "salt",
+    "table salt": "salt",
+    "black pepper": "pepper",
+    "ground black pepper": "pepper",
+    "cold water": "water",
+    "boiling water": "water",
+    "warm water": "water",
+    "chicken stock cube": "chicken stock",
+    "beef stock cube": "beef stock",
+    "vegetable stock cube": "vegetable stock",
+    "basil leaf": "basil",
+    "mint leaf": "mint",
+    "parsley leaf": "parsley",
+    "coriander leaf": "coriander",
+}
+
+_SPACES = re.compile(r"\s+")
+
+
+def singular(word):
+    """Singular form of one word by English plural rules"""
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if word in NOT_PLURAL or len(word) <= 3 or not word.endswith("s") or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes", "sses", "zes")):
+        return word[:-2]
+    return word[:-1]
+
+
+def _canonical_once(name):
+    name = _SPACES.sub(" ", name.split(",")[0].split("(")[0]).strip()
+    words = name.split(" ")
+    while len(words) > 1 and words[0] in DESCRIPTORS:
+        words.pop(0)
+    words[-1] = singular(words[-1])
+    name = " ".join(words)
+    return SYNONYMS.get(name, name)
+
+
+def canonical_name(raw):
+    """Canonical name of a raw ingredient string ("Fresh Tomatoes" -> "tomato").
+
+    Idempotent: a canonical name maps to itself.
+    """
+    name = raw.strip().lower()
+    while True:
+        canonical = _canonical_once(name)
+        if canonical == name or not canonical:
+            return canonical or name
+        name = canonical
@@ -0,0 +1,265 @@
+import json
+import os
+import string
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from mealdb_client import get_json, request_count
+from snapshot import SNAPSHOT_FILE, build_snapshot
+
+CRAWL_WORKERS = 8
+CHECKPOINT_FILE = "recipes_checkpoint.jsonl"
+SWEEP_CHARACTERS = string.ascii_lowercase + string.digits
+
+
+def fetch_category_listing(category):
+    """Fetch the summary records (idMeal, strMeal, strMealThumb) listed under a category.
+
+    A request that still fails after retries raises requests.RequestException.
+    """
+    data = get_json("filter.php", c=category)
+    return data.get("meals") or []
+
+
+def fetch_meal_detail(meal_id, revalidate=False):
+    """Fetch the full detail record of a single meal, or None if the API no longer has it.
+
+    With revalidate, a cached copy is only reused if the API confirms it is
+    current. A request that still fails after retries raises
+    requests.RequestException.
+    """
+    data = get_json("lookup.php", max_age=0 if revalidate else None, i=meal_id)
+    meals = data.get("meals") or []
+    if not meals:
+        print(f"Meal {meal_id} not found in API")
+        return None
+    return meals[0]
+
+
+def fetch_meals_by_first_letter(character):
+    """Fetch the full records of all meals whose name starts with a character.
+
+    A request that still fails after retries raises requests.RequestException.
+    """
+    data = get_json("search.php", f=character)
+    return data.get("meals") or []
+
+
+def load_checkpoint(checkpoint_file=CHECKPOINT_FILE):
+    """Read meals spilled by an interrupted crawl, keyed by idMeal.
+
+    A torn last line left by a crash is ignored.
+    """
+    meals = {}
+    if not os.path.exists(checkpoint_file):
+        return meals
+    with open(checkpoint_file, "r") as f:
+        for line in f:
+            try:
+                meal = json.loads(line)
+            except ValueError:
+                continue
+            meals[meal["idMeal"]] = meal
+    return meals
+
+
+def write_cache(cache_file, meals, checkpoint_file=CHECKPOINT_FILE, snapshot_file=SNAPSHOT_FILE):
+    """Atomically replace the JSON cache, emit the normalized snapshot and drop the crawl checkpoint"""
+    tmp_file = f"{cache_file}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(meals, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, cache_file)
+    build_snapshot(meals, snapshot_file)
+    if os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+
+
+def _fetch_listings(pool, categories):
+    """Fetch every category listing; returns (listings, failed requests)"""
+    futures = [pool.submit(fetch_category_listing, category) for category in categories]
+    listings, failed = [], []
+    for category, future in zip(categories, futures):
+        try:
+            listings.append(future.result())
+        except requests.RequestException as e:
+            print(f"Error listing category {category}: {e}")
+            failed.append(f"filter.php?c={category}")
+    return listings, failed
+
+
+def _fetch_details(pool, meal_ids, checkpoint_file, revalidate=False):
+    """Look up meal details, appending each one to the checkpoint as it arrives.
+
+    Meals already in the checkpoint are not requested again; checkpoint
+    entries for other IDs, left by a different interrupted crawl or sync, are
+    ignored. revalidate bypasses fresh cached lookups. Returns (meals by
+    idMeal, failed requests), covering only the requested IDs.
+    """
+    wanted = set(meal_ids)
+    fetched = {meal_id: meal for meal_id, meal in load_checkpoint(checkpoint_file).items() if meal_id in wanted}
+    pending = [meal_id for meal_id in meal_ids if meal_id not in fetched]
+    if fetched:
+        print(f"Resuming crawl: {len(fetched)} meals in checkpoint, {len(pending)} to fetch")
+
+    futures = {pool.submit(fetch_meal_detail, meal_id, revalidate): meal_id for meal_id in pending}
+    failed = []
+    try:
+        with open(checkpoint_file, "a") as f:
+            for future in as_completed(futures):
+                try:
+                    meal = future.result()
+                except requests.RequestException as e:
+                    print(f"Error fetching meal {futures[future]}: {e}")
+                    failed.append(f"lookup.php?i={futures[future]}")
+                    continue
+                if meal:
+                    f.write(json.dumps(meal) + "\n")
+                    f.flush()
+                    fetched[meal["idMeal"]] = meal
+    except BaseException:
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    return fetched, sorted(failed)
+
+
+def crawl_all_meals(categories, workers=CRAWL_WORKERS, checkpoint_file=CHECKPOINT_FILE):
+    """Fetch detail records for every meal in the given categories.
+
+    Category listings and meal lookups are fanned out over a pool of
+    `workers` threads; results keep category order, then listing order.
+    Fetched meals are spilled to `checkpoint_file` so an interrupted crawl
+    resumes with only the missing lookups. Returns (all_meals, failed), where
+    failed lists the requests that still failed after retries; the crawl is
+    only complete when it is empty.
+    """
+    start, requests_before = time.perf_counter(), request_count()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        listings, failed = _fetch_listings(pool, categories)
+        meal_ids = [summary["idMeal"] for summary in _unique_summaries(listings)]
+        fetched, failed_lookups = _fetch_details(pool, meal_ids, checkpoint_file)
+
+    all_meals = [fetched[meal_id] for meal_id in meal_ids if meal_id in fetched]
+    _report("Crawled", len(all_meals), start, requests_before, workers)
+    return all_meals, failed + failed_lookups
+
+
+def crawl_by_first_letter(categories, workers=CRAWL_WORKERS, checkpoint_file=CHECKPOINT_FILE):
+    """Fetch the whole catalog with one search.php?f= sweep per character.
+
+    search.php returns full records, so the sweep needs about 36 requests
+    regardless of catalog size. It can still miss meals: a name that does not
+    start with a letter or digit (" Bubble & Squeak") matches no sweep
+    character, and a failed sweep request drops a whole letter. The category
+    listings are therefore fetched as well, and any listed meal the sweep did
+    not return is looked up like crawl_all_meals does. Results keep sweep
+    order, then listing order. Returns (all_meals, failed) like
+    crawl_all_meals.
+    """
+    start, requests_before = time.perf_counter(), request_count()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        sweep = [pool.submit(fetch_meals_by_first_letter, character) for character in SWEEP_CHARACTERS]
+        listings, failed = _fetch_listings(pool, categories)
+
+        all_meals = []
+        seen = set()
+        for character, future in zip(SWEEP_CHARACTERS, sweep):
+            try:
+                batch = future.result()
+            except requests.RequestException as e:
+                print(f"Error searching meals starting with {character!r}: {e}")
+                continue
+            for meal in batch:
+                if meal["idMeal"] not in seen:
+                    seen.add(meal["idMeal"])
+                    all_meals.append(meal)
+
+        summaries = _unique_summaries(listings)
+        missed = [summary["idMeal"] for summary in summaries if summary["idMeal"] not in seen]
+        if missed:
+            print(f"Letter sweep found {len(summaries) - len(missed)} of {len(summaries)} listed meals, "
+                  f"looking up the {len(missed)} it missed")
+            fetched, failed_lookups = _fetch_details(pool, missed, checkpoint_file)
+            all_meals.extend(fetched[meal_id] for meal_id in missed if meal_id in fetched)
+            failed += failed_lookups
+
+    _report("Swept", len(all_meals), start, requests_before, workers)
+    return all_meals, failed
+
+
+def sync_meals(cached_meals, categories, workers=CRAWL_WORKERS, checkpoint_file=CHECKPOINT_FILE):
+    """Bring a previously crawled meal list up to date with the API.
+
+    Only the category listings are always requested; a detail lookup is
+    issued just for meals that are new or whose listing no longer matches
+    the cached record. Returns (all_meals, fetched_ids, failed), keeping
+    cached order with new meals appended in listing order; failed lists the
+    requests that still failed after retries.
+    """
+    start, requests_before = time.perf_counter(), request_count()
+    cached_by_id = {meal["idMeal"]: meal for meal in cached_meals}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        listings, failed = _fetch_listings(pool, categories)
+        summaries = _unique_summaries(listings)
+        stale_ids = [
+            summary["idMeal"] for summary in summaries
+            if summary["idMeal"] not in cached_by_id
+            or _is_stale(cached_by_id[summary["idMeal"]], summary)
+        ]
+        # The listing says these changed, so a lookup cached by the last crawl is out of date.
+        fetched, failed_lookups = _fetch_details(pool, stale_ids, checkpoint_file, revalidate=True)
+
+    all_meals = [fetched.get(meal["idMeal"], meal) for meal in cached_meals]
+    all_meals.extend(
+        fetched[summary["idMeal"]] for summary in summaries
+        if summary["idMeal"] in fetched and summary["idMeal"] not in cached_by_id
+    )
+    fetched_ids = {meal["idMeal"] for meal in all_meals if meal["idMeal"] in fetched}
+
+    listed_ids = {summary["idMeal"] for summary in summaries}
+    unlisted = sum(1 for meal_id in cached_by_id if meal_id not in listed_ids)
+    if unlisted:
+        print(f"{unlisted} cached meals are no longer listed by the API, keeping them")
+
+    _report("Synced", len(fetched_ids), start, requests_before, workers)
+    return all_meals, fetched_ids, failed + failed_lookups
+
+
+def _unique_summaries(listings):
+    """Flatten per-category listings, dropping repeated meal IDs"""
+    summaries = []
+    seen = set()
+    for listing in listings:
+        for summary in listing:
+            if summary["idMeal"] not in seen:
+                seen.add(summary["idMeal"])
+                summaries.append(summary)
+    return summaries
+
+
+def _is_stale(cached_meal, summary):
+    """Compare the fields a listing shares with the cached detail record.
+
+    filter.php only returns name and thumbnail today; dateModified is
+    compared too whenever the listing carries it.
+    """
+    for key in ("strMeal", "strMealThumb", "dateModified"):
+        if key in summary and summary[key] != cached_meal.get(key):
+            return True
+    return False
+
+
+def _report(action, meal_count, start, requests_before, workers):
+    """Print wall-clock time and throughput for a crawl.
+
+    The request count is the mealdb_client counter diffed over the crawl, so
+    it covers every HTTP attempt including retries, and no cache hits.
+    """
+    elapsed = time.perf_counter() - start
+    requests_made = request_count() - requests_before
+    rate = requests_made / elapsed if elapsed > 0 else 0.0
+    print(f"{action} {meal_count} meals with {requests_made} requests "
+          f"in {elapsed:.1f}s ({rate:.1f} req/s, {workers} workers)")
@@ -0,0 +1,188 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+
+from connect import DATABASE, USER, PASSWORD, HOST, PORT
+
+MIN_CONNECTIONS = 1
+MAX_CONNECTIONS = 4
+CONNECT_TIMEOUT = 10
+READ_RETRIES = 2
+WARMUP_INTERVAL = 240
+
+# TCP keepalives stop idle connections from being silently dropped by NAT
+# and load balancers while the Neon compute is suspended.
+KEEPALIVE_OPTIONS = {
+    "keepalives": 1,
+    "keepalives_idle": 30,
+    "keepalives_interval": 10,
+    "keepalives_count": 3,
+}
+
+pool_stats = {
+    "connects": 0, "connect_time": 0.0, "max_connect_time": 0.0,
+    "acquires": 0, "acquire_time": 0.0, "max_acquire_time": 0.0,
+    "discarded": 0, "retries": 0,
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+_stats_lock = threading.Lock()
+
+
+def _record(kind, elapsed):
+    """Add a connect or acquire latency sample"""
+    with _stats_lock:
+        pool_stats[f"{kind}s"] += 1
+        pool_stats[f"{kind}_time"] += elapsed
+        pool_stats[f"max_{kind}_time"] = max(pool_stats[f"max_{kind}_time"], elapsed)
+
+
+class SearchConnection(psycopg2.extensions.connection):
+    """Connection that remembers which statements it has prepared"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
+
+def execute_prepared(cursor, name, sql, params):
+    """EXECUTE a named statement, PREPAREing it first on this connection if needed.
+
+    `sql` uses $1, $2, ... placeholders; `params` is a sequence of
+    (value, SQL type) pairs. Connections that are not SearchConnections run
+    the same statement unprepared.
+    """
+    values = [value for value, _ in params]
+    prepared = getattr(cursor.connection, "prepared_statements", None)
+    if prepared is None:
+        types = [sql_type for _, sql_type in params]
+        inline = re.sub(r"\$(\d+)", lambda m: f"%(p{m.group(1)})s::{types[int(m.group(1)) - 1]}",
+                        sql.replace("%", "%%"))
+        cursor.execute(inline, {f"p{i}": value for i, value in enumerate(values, start=1)})
+        return
+    if name not in prepared:
+        types = ", ".join(sql_type for _, sql_type in params)
+        cursor.execute(f"PREPARE {name} ({types}) AS {sql}")
+        prepared.add(name)
+    cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(values))});", values)
+
+
+class TimedConnectionPool(psycopg2.pool.ThreadedConnectionPool):
+    """Thread-safe pool that records how long new connections take"""
+
+    def _connect(self, key=None):
+        start = time.perf_counter()
+        connection = super()._connect(key)
+        connection.autocommit = True
+        _record("connect", time.perf_counter() - start)
+        return connection
+
+
+def get_pool():
+    """Return the shared read pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = TimedConnectionPool(
+                MIN_CONNECTIONS, MAX_CONNECTIONS,
+                database=DATABASE,
+                user=USER,
+                password=PASSWORD,
+                host=HOST,
+                port=PORT,
+                connect_timeout=CONNECT_TIMEOUT,
+                connection_factory=SearchConnection,
+                **KEEPALIVE_OPTIONS
+            )
+        return _pool
+
+
+@contextmanager
+def pooled_connection():
+    """Borrow an autocommit connection; broken connections are discarded on return"""
+    pool = get_pool()
+    start = time.perf_counter()
+    connection = pool.getconn()
+    _record("acquire", time.perf_counter() - start)
+    broken = False
+    try:
+        yield connection
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        with _stats_lock:
+            pool_stats["discarded"] += 1
+        raise
+    finally:
+        pool.putconn(connection, close=broken or bool(connection.closed))
+
+
+def run_read(func, retries=READ_RETRIES):
+    """Run func(cursor) for an idempotent read, reconnecting if the connection died"""
+    for attempt in range(retries + 1):
+        try:
+            with pooled_connection() as connection:
+                with connection.cursor() as cursor:
+                    return func(cursor)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            if attempt == retries:
+                raise
+            with _stats_lock:
+                pool_stats["retries"] += 1
+
+
+def ping():
+    """Round-trip a trivial query, waking a suspended Neon compute"""
+    run_read(lambda cursor: cursor.execute("SELECT 1;"))
+
+
+def start_warmup(interval=None, setup=None):
+    """Ping in the background now and, if interval is set, every interval seconds.
+
+    If given, setup(connection) replaces the first ping, e.g. to check the
+    schema version on the connection that wakes the database.
+    """
+    def warm():
+        first = setup
+        while True:
+            try:
+                if first:
+                    with pooled_connection() as connection:
+                        first(connection)
+                else:
+                    ping()
+            except psycopg2.Error as e:
+                print(f"Database warm-up failed: {e}")
+            first = None
+            if not interval:
+                return
+            time.sleep(interval)
+
+    thread = threading.Thread(target=warm, daemon=True)
+    thread.start()
+    return thread
+
+
+def close_pool():
+    """Close every pooled connection"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+def print_stats():
+    """Print connect/acquire latency and reconnect/retry counters"""
+    with _stats_lock:
+        stats = dict(pool_stats)
+    for kind in ("connect", "acquire"):
+        count = stats[f"{kind}s"]
+        avg_ms = stats[f"{kind}_time"] / count * 1000 if count else 0.0
+        print(f"{kind}: {count} times, avg {avg_ms:.1f} ms, max {stats[f'max_{kind}_time'] * 1000:.1f} ms")
+    print(f"discarded connections: {stats['discarded']}, retried reads: {stats['retries']}")
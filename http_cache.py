@@ -0,0 +1,87 @@
+import sqlite3
+import threading
+import time
+
+CACHE_FILE = "http_cache.sqlite3"
+MAX_CACHE_BYTES = 50 * 1024 * 1024
+
+
+class ResponseCache:
+    """On-disk store of raw response bodies keyed by URL, evicted LRU by size"""
+
+    def __init__(self, path=CACHE_FILE, max_bytes=MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at);")
+        self._db.commit()
+        self._size = self._db.execute("SELECT COALESCE(SUM(LENGTH(body)), 0) FROM responses;").fetchone()[0]
+
+    def get(self, url):
+        """Return the stored entry for a URL as a dict, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, etag, last_modified, stored_at FROM responses WHERE url = ?;", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE url = ?;", (time.time(), url))
+            self._db.commit()
+        body, etag, last_modified, stored_at = row
+        return {"body": body, "etag": etag, "last_modified": last_modified, "stored_at": stored_at}
+
+    def put(self, url, body, etag=None, last_modified=None):
+        """Store a response body with its validators, evicting old entries if over budget"""
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT LENGTH(body) FROM responses WHERE url = ?;", (url,)).fetchone()
+            self._db.execute("""
+                INSERT OR REPLACE INTO responses (url, body, etag, last_modified, stored_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?);
+            """, (url, body, etag, last_modified, now, now))
+            self._size += len(body) - (old[0] if old else 0)
+            self._evict()
+            self._db.commit()
+
+    def refresh(self, url):
+        """Mark an entry fresh again after a 304 Not Modified"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE url = ?;", (now, now, url)
+            )
+            self._db.commit()
+
+    def clear(self):
+        """Drop every stored response"""
+        with self._lock:
+            self._db.execute("DELETE FROM responses;")
+            self._db.commit()
+            self._size = 0
+
+    def _evict(self):
+        """Delete least recently used entries until the store fits in max_bytes"""
+        while self._size > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT url, LENGTH(body) FROM responses ORDER BY accessed_at LIMIT 32;"
+            ).fetchall()
+            if not rows:
+                self._size = 0
+                return
+            for url, size in rows:
+                self._db.execute("DELETE FROM responses WHERE url = ?;", (url,))
+                self._size -= size
+                self.evictions += 1
+                if self._size <= self.max_bytes:
+                    return
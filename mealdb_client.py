@@ -0,0 +1,177 @@
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import ResponseCache
+
+API_URL = os.environ.get("MEALDB_API_URL", "https://www.themealdb.com/api/json/v1/1")
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 15
+POOL_SIZE = 16
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Seconds a cached response is served without revalidation; endpoints not
+# listed here are never cached. filter.php always revalidates so incremental
+# sync sees new meals; sync's lookups of changed meals pass max_age=0.
+CACHE_ENABLED = True
+CACHE_TTLS = {
+    "list.php": 86400,
+    "filter.php": 0,
+    "lookup.php": 7 * 86400,
+    "search.php": 86400,
+}
+
+endpoint_stats = {}
+
+_session = None
+_session_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_cache = None
+
+
+def get_session():
+    """Return the shared keep-alive session, creating it on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def get_response_cache():
+    """Return the shared on-disk response cache, or None when caching is off"""
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    with _session_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+
+def _record(endpoint, elapsed=None, *counters):
+    """Update the per-endpoint latency and the named counters"""
+    with _stats_lock:
+        stats = endpoint_stats.setdefault(endpoint, {
+            "requests": 0, "retries": 0, "errors": 0,
+            "cache_hits": 0, "cache_misses": 0, "revalidated": 0,
+            "total_time": 0.0, "max_time": 0.0,
+        })
+        if elapsed is not None:
+            stats["requests"] += 1
+            stats["total_time"] += elapsed
+            stats["max_time"] = max(stats["max_time"], elapsed)
+        for counter in counters:
+            stats[counter] += 1
+
+
+# Transient failures; anything else (InvalidURL, MissingSchema,
+# TooManyRedirects, ...) fails the same way on every attempt.
+RETRYABLE_ERRORS = (
+    requests.Timeout,
+    requests.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.JSONDecodeError,
+)
+
+
+def _is_retryable(error):
+    """Timeouts, dropped connections, truncated or undecodable bodies and 5xx/429 are worth retrying"""
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in RETRY_STATUSES
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+def _backoff_delay(attempt):
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def get_json(endpoint, max_age=None, **params):
+    """GET an API endpoint (e.g. "lookup.php") and return its decoded JSON body.
+
+    Responses of endpoints in CACHE_TTLS are served from the on-disk cache
+    while fresh and revalidated with ETag/Last-Modified once stale; max_age
+    overrides the endpoint's TTL (0 always revalidates).
+    Transient failures are retried with backoff; once retries are exhausted
+    the last requests.RequestException is raised to the caller.
+    """
+    url = f"{API_URL}/{endpoint}"
+    cache = get_response_cache() if endpoint in CACHE_TTLS else None
+    cache_key = f"{url}?{urlencode(sorted(params.items()))}"
+    entry = cache.get(cache_key) if cache else None
+    ttl = CACHE_TTLS.get(endpoint, 0) if max_age is None else max_age
+    if entry and time.time() - entry["stored_at"] < ttl:
+        _record(endpoint, None, "cache_hits")
+        return json.loads(entry["body"])
+
+    headers = {}
+    if entry and entry["etag"]:
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry["last_modified"]:
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    session = get_session()
+    for attempt in range(MAX_RETRIES + 1):
+        start = time.perf_counter()
+        try:
+            response = session.get(url, params=params, headers=headers,
+                                   timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+            response.raise_for_status()
+            if response.status_code == 304 and entry:
+                cache.refresh(cache_key)
+                _record(endpoint, time.perf_counter() - start, "revalidated")
+                return json.loads(entry["body"])
+            data = response.json()
+            if cache:
+                cache.put(cache_key, response.content,
+                          response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            _record(endpoint, time.perf_counter() - start, *(("cache_misses",) if cache else ()))
+            return data
+        except requests.RequestException as e:
+            elapsed = time.perf_counter() - start
+            if attempt == MAX_RETRIES or not _is_retryable(e):
+                _record(endpoint, elapsed, "errors")
+                raise
+            _record(endpoint, elapsed, "retries")
+            time.sleep(_backoff_delay(attempt))
+
+
+def reset_stats():
+    """Clear the per-endpoint counters"""
+    with _stats_lock:
+        endpoint_stats.clear()
+
+
+def request_count():
+    """HTTP attempts across all endpoints since the last reset, retries included"""
+    with _stats_lock:
+        return sum(stats["requests"] for stats in endpoint_stats.values())
+
+
+def print_stats():
+    """Print request count, latency and retries per endpoint"""
+    with _stats_lock:
+        rows = sorted(endpoint_stats.items())
+    for endpoint, stats in rows:
+        avg_ms = stats["total_time"] / stats["requests"] * 1000 if stats["requests"] else 0.0
+        print(f"{endpoint}: {stats['requests']} requests, avg {avg_ms:.0f} ms, "
+              f"max {stats['max_time'] * 1000:.0f} ms, "
+              f"{stats['retries']} retries, {stats['errors']} errors, "
+              f"cache {stats['cache_hits']} hits / {stats['cache_misses']} misses / "
+              f"{stats['revalidated']} revalidated")
+    if _cache is not None and _cache.evictions:
+        print(f"Response cache evictions: {_cache.evictions}")
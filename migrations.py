@@ -0,0 +1,134 @@
+"""Ordered, versioned schema migrations.
+
+Each migration is (version, description, SQL) and runs once; pending
+migrations and their schema_migrations rows commit together. Migration 1 is the schema the old
+create_tables built with IF NOT EXISTS, so databases created before
+migrations existed are adopted in place. Append new migrations; never edit
+or renumber applied ones.
+"""
+import psycopg2
+import psycopg2.errors
+
+MIGRATIONS = [
+    (1, "base tables", """
+        CREATE TABLE IF NOT EXISTS recipes (
+            meal_id INTEGER PRIMARY KEY,
+            name TEXT,
+            category TEXT,
+            area TEXT,
+            instructions TEXT
+        );
+        ALTER TABLE recipes
+            ADD COLUMN IF NOT EXISTS thumbnail TEXT,
+            ADD COLUMN IF NOT EXISTS tags TEXT,
+            ADD COLUMN IF NOT EXISTS youtube TEXT,
+            ADD COLUMN IF NOT EXISTS source TEXT,
+            ADD COLUMN IF NOT EXISTS ingredient_ids INTEGER[];
+        CREATE INDEX IF NOT EXISTS recipes_ingredient_ids_idx
+        ON recipes USING GIN (ingredient_ids);
+
+        CREATE TABLE IF NOT EXISTS ingredient_list (
+            id SERIAL PRIMARY KEY,
+            name TEXT UNIQUE
+        );
+
+        CREATE TABLE IF NOT EXISTS recipe_ingredients (
+            recipe_id INTEGER REFERENCES recipes(meal_id),
+            ingredient_id INTEGER REFERENCES ingredient_list(id),
+            PRIMARY KEY (recipe_id, ingredient_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS recipe_ingredient_lines (
+            recipe_id INTEGER REFERENCES recipes(meal_id),
+            position SMALLINT,
+            ingredient_id INTEGER REFERENCES ingredient_list(id),
+            measure TEXT,
+            PRIMARY KEY (recipe_id, position)
+        );
+
+        CREATE TABLE IF NOT EXISTS catalog_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            content_hash TEXT NOT NULL,
+            snapshot_version INTEGER NOT NULL,
+            recipe_count INTEGER NOT NULL,
+            loaded_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        ALTER TABLE catalog_meta
+            ADD COLUMN IF NOT EXISTS loader_version INTEGER NOT NULL DEFAULT 1;
+    """),
+    # The primary key leads with recipe_id; ingredient-first lookups
+    # (recipes using an ingredient, anti-joins on excluded ingredients) need
+    # the reverse order, and covering recipe_id keeps them index-only.
+    (2, "ingredient-first recipe_ingredients index", """
+        CREATE INDEX IF NOT EXISTS recipe_ingredients_ingredient_recipe_idx
+        ON recipe_ingredients (ingredient_id, recipe_id);
+    """),
+    # Category/area filters and facet counts.
+    (3, "recipes category/area index", """
+        CREATE INDEX IF NOT EXISTS recipes_category_area_idx
+        ON recipes (category, area);
+    """),
+    # Fuzzy ingredient lookup (term <<% name) for search term expansion.
+    (4, "trigram index on ingredient names", """
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS ingredient_list_name_trgm_idx
+        ON ingredient_list USING GIN (name gin_trgm_ops);
+    """),
+    # Raw ingredient names point at their canonical name's row (canonical
+    # rows point at themselves); recipe_ingredients holds canonical IDs.
+    # Existing rows start out canonical until the next load.
+    (5, "canonical ingredient IDs", """
+        ALTER TABLE ingredient_list
+            ADD COLUMN IF NOT EXISTS canonical_id INTEGER REFERENCES ingredient_list(id);
+        UPDATE ingredient_list SET canonical_id = id WHERE canonical_id IS NULL;
+    """),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Serializes concurrent migrators (an ingest and a search starting together).
+LOCK_KEY = 0x44504D47
+
+
+def schema_version(cursor):
+    """The highest applied migration, or 0 for an empty database.
+
+    One round trip: the bookkeeping table is created if missing, then read.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        SELECT coalesce(max(version), 0) FROM schema_migrations;
+    """)
+    return cursor.fetchone()[0]
+
+
+def applied_version(cursor):
+    """The highest applied migration, read without creating anything; 0 if none has run.
+
+    For read-only callers such as search, on an autocommit connection.
+    """
+    try:
+        cursor.execute("SELECT coalesce(max(version), 0) FROM schema_migrations;")
+    except psycopg2.errors.UndefinedTable:
+        return 0
+    return cursor.fetchone()[0]
+
+
+def apply_migrations(cursor):
+    """Apply pending migrations inside the caller's transaction; returns how many ran"""
+    if schema_version(cursor) >= LATEST_VERSION:
+        return 0
+
+    cursor.execute("SELECT pg_advisory_xact_lock(%s);", (LOCK_KEY,))
+    current = schema_version(cursor)
+    pending = [migration for migration in MIGRATIONS if migration[0] > current]
+    for version, description, sql in pending:
+        cursor.execute(sql)
+        cursor.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s);",
+                       (version, description))
+        print(f"Applied migration {version}: {description}")
+    return len(pending)
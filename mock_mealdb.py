@@ -0,0 +1,181 @@
+"""Local stand-in for the TheMealDB v1 API, served from the JSON caches.
+
+Responses carry an ETag and Last-Modified and conditional requests are
+answered with 304 Not Modified, like a CDN in front of the real API.
+
+Start it with: python mock_mealdb.py --port 8765 --latency 0.05 --error-rate 0.01
+and point the app at it with MEALDB_API_URL=http://127.0.0.1:8765/api/json/v1/1
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API_PATH = "/api/json/v1/1/"
+DEFAULT_PORT = 8765
+
+
+def _ingredients(meal):
+    """Lowercased ingredient names of a raw meal record"""
+    names = []
+    for i in range(1, 21):
+        ingredient = meal.get(f"strIngredient{i}")
+        if ingredient and ingredient.strip():
+            names.append(ingredient.strip().lower())
+    return names
+
+
+def _summary(meal):
+    """The reduced record filter.php returns"""
+    return {"strMeal": meal["strMeal"], "strMealThumb": meal.get("strMealThumb"), "idMeal": meal["idMeal"]}
+
+
+class MealStore:
+    """Answers API queries from a list of raw meal records"""
+
+    def __init__(self, meals, categories):
+        self.meals = list(meals)
+        self.categories = categories
+        self.by_id = {meal["idMeal"]: meal for meal in self.meals}
+        self.modified_at = int(time.time())
+
+    def put(self, meal):
+        """Add a meal or replace the one with the same idMeal"""
+        if meal["idMeal"] in self.by_id:
+            self.meals[self.meals.index(self.by_id[meal["idMeal"]])] = meal
+        else:
+            self.meals.append(meal)
+        self.by_id[meal["idMeal"]] = meal
+        self.modified_at = int(time.time())
+
+    def handle(self, endpoint, params):
+        """Return the JSON payload for an endpoint, or None if it is unknown"""
+        if endpoint == "list.php":
+            if "c" in params:
+                return [{"strCategory": category} for category in self.categories]
+            if "a" in params:
+                return [{"strArea": area} for area in sorted({meal["strArea"] for meal in self.meals})]
+            if "i" in params:
+                names = sorted({name for meal in self.meals for name in _ingredients(meal)})
+                return [{"strIngredient": name} for name in names]
+        elif endpoint == "filter.php":
+            if "c" in params:
+                return [_summary(meal) for meal in self.meals if meal["strCategory"] == params["c"]]
+            if "a" in params:
+                return [_summary(meal) for meal in self.meals if meal["strArea"] == params["a"]]
+            if "i" in params:
+                wanted = params["i"].replace("_", " ").lower()
+                return [_summary(meal) for meal in self.meals if wanted in _ingredients(meal)]
+        elif endpoint == "lookup.php":
+            meal = self.by_id.get(params.get("i"))
+            return [meal] if meal else []
+        elif endpoint == "search.php":
+            if "f" in params:
+                letter = params["f"][:1].lower()
+                return [meal for meal in self.meals if meal["strMeal"].lower().startswith(letter)]
+            if "s" in params:
+                term = params["s"].lower()
+                return [meal for meal in self.meals if term in meal["strMeal"].lower()]
+        return None
+
+
+def make_handler(store, latency=0.0, error_rate=0.0):
+    """Build a request handler class bound to a store and fault settings"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency:
+                time.sleep(random.uniform(0.5 * latency, 1.5 * latency))
+            if error_rate and random.random() < error_rate:
+                self.send_error(503, "Injected failure")
+                return
+
+            url = urlparse(self.path)
+            if not url.path.startswith(API_PATH):
+                self.send_error(404)
+                return
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            meals = store.handle(url.path[len(API_PATH):], params)
+            if meals is None:
+                self.send_error(404)
+                return
+
+            body = json.dumps({"meals": meals or None}).encode()
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            last_modified = formatdate(store.modified_at, usegmt=True)
+            if self._not_modified(etag, store.modified_at):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", last_modified)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _not_modified(self, etag, modified_at):
+            """Evaluate If-None-Match, or If-Modified-Since when no ETag was sent"""
+            if_none_match = self.headers.get("If-None-Match")
+            if if_none_match is not None:
+                return etag in (tag.strip() for tag in if_none_match.split(","))
+            if_modified_since = self.headers.get("If-Modified-Since")
+            if if_modified_since is None:
+                return False
+            try:
+                return modified_at <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_server(port=DEFAULT_PORT, latency=0.0, error_rate=0.0,
+                 recipes_file="recipes_cache.json", categories_file="categories_cache.json"):
+    """Serve the cached catalog on a background thread; returns (server, api_url)"""
+    with open(recipes_file, "r") as f:
+        meals = json.load(f)
+    with open(categories_file, "r") as f:
+        categories = json.load(f)
+    return serve(MealStore(meals, categories), port, latency, error_rate)
+
+
+def serve(store, port=DEFAULT_PORT, latency=0.0, error_rate=0.0):
+    """Serve a MealStore on a background thread; returns (server, api_url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(store, latency, error_rate))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    host, bound_port = server.server_address
+    return server, f"http://{host}:{bound_port}{API_PATH.rstrip('/')}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean injected latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    server, api_url = start_server(args.port, args.latency, args.error_rate)
+    print(f"Serving TheMealDB stand-in at {api_url} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""In-process trigram index over ingredient names, mirroring pg_trgm.
+
+Text is lowercased and split into alphanumeric words; each word is padded
+with two leading blanks and one trailing blank before its trigrams are
+taken, exactly as pg_trgm does, so scores match strict_word_similarity().
+"""
+import heapq
+import re
+from collections import defaultdict
+
+# pg_trgm.strict_word_similarity_threshold default
+STRICT_WORD_SIMILARITY_THRESHOLD = 0.5
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def word_trigrams(word):
+    """Trigrams of one padded word"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigrams(text):
+    """Trigram set of a string, as pg_trgm's show_trgm()"""
+    result = set()
+    for word in _WORD.findall(text.lower()):
+        result |= word_trigrams(word)
+    return result
+
+
+def similarity(a, b):
+    """Jaccard similarity of two trigram sets"""
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+class NgramIndex:
+    """Trigram -> name postings plus per-word trigram sets for scoring"""
+
+    def __init__(self, names):
+        self.names = list(names)
+        self._words = [[word_trigrams(word) for word in _WORD.findall(name.lower())] for name in self.names]
+        self._trigrams = [set().union(*words) for words in self._words]
+        self._postings = defaultdict(set)
+        for i, grams in enumerate(self._trigrams):
+            for gram in grams:
+                self._postings[gram].add(i)
+
+    def _strict_word_similarity(self, query, i):
+        """Best similarity between the query and a run of whole words of name i"""
+        words = self._words[i]
+        best = 0.0
+        for start in range(len(words)):
+            span = set()
+            for end in range(start, len(words)):
+                span |= words[end]
+                best = max(best, similarity(query, span))
+        return best
+
+    def search(self, term, limit=8, threshold=STRICT_WORD_SIMILARITY_THRESHOLD):
+        """(name, score) pairs matching a term, best first; ties go to the closer whole name"""
+        query = trigrams(term)
+        candidates = set()
+        for gram in query:
+            candidates |= self._postings.get(gram, set())
+        scored = []
+        for i in candidates:
+            score = self._strict_word_similarity(query, i)
+            if score >= threshold:
+                scored.append((-score, -similarity(query, self._trigrams[i]), self.names[i]))
+        return [(name, -negative_score) for negative_score, _, name in heapq.nsmallest(limit, scored)]
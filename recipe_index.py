@@ -0,0 +1,259 @@
+"""In-process inverted index: ingredient -> bitmap of dense recipe indices.
+
+Bitmaps are plain Python ints (bit i set = recipe i uses the ingredient),
+so AND/OR/AND-NOT run in C over whole machine words. Built from a recipe
+snapshot, the index answers ingredient searches without a database.
+"""
+import heapq
+import re
+from collections import Counter, defaultdict
+
+from allergens import matches_exclusion
+from canonical import canonical_name
+from ngram_index import NgramIndex
+
+_NONZERO_BYTE = re.compile(rb"[^\x00]")
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+def bitmap_from_indices(indices, size):
+    """Bitmap with the given bit positions set"""
+    data = bytearray((size + 7) // 8)
+    for i in indices:
+        data[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(data, "little")
+
+
+def iter_bits(bitmap):
+    """Set bit positions of a bitmap, ascending"""
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    for match in _NONZERO_BYTE.finditer(data):
+        base = match.start() * 8
+        for bit in _BYTE_BITS[data[match.start()]]:
+            yield base + bit
+
+
+class RecipeIndex:
+    """Recipe rows plus one bitmap per ingredient and per category and area value.
+
+    `recipes` holds (meal_id, name, category, area) per dense recipe index,
+    `postings` the dense recipe indices of each ingredient. The postings are
+    the columns of the sparse recipe x ingredient matrix; the per-recipe
+    ingredient lists are its rows. With a snapshot attached the index also
+    serves the recipe detail view.
+    """
+
+    def __init__(self, recipes, ingredient_names, postings, snapshot=None):
+        self.recipes = recipes
+        self.ingredient_names = list(ingredient_names)
+        self.bitmaps = [bitmap_from_indices(p, len(recipes)) for p in postings]
+        self.counts = [len(p) for p in postings]
+        self.postings = postings
+        self.recipe_ingredients = [[] for _ in recipes]
+        for ingredient_id, recipe_indices in enumerate(postings):
+            for i in recipe_indices:
+                self.recipe_ingredients[i].append(ingredient_id)
+        self.sizes = [len(ingredient_ids) for ingredient_ids in self.recipe_ingredients]
+        self.any_ingredient = 0
+        for bitmap in self.bitmaps:
+            self.any_ingredient |= bitmap
+        self.all_recipes = (1 << len(recipes)) - 1
+        self.facet_bitmaps = {}
+        for facet, column in (("category", 2), ("area", 3)):
+            members = defaultdict(list)
+            for i, row in enumerate(recipes):
+                members[row[column]].append(i)
+            self.facet_bitmaps[facet] = {value: bitmap_from_indices(indices, len(recipes))
+                                         for value, indices in members.items()}
+        self._ingredient_ids = {name: i for i, name in enumerate(self.ingredient_names)}
+        self.ngrams = NgramIndex(self.ingredient_names)
+        self._positions = {row[0]: i for i, row in enumerate(recipes)}
+        self._snapshot = snapshot
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Index a snapshot by canonical ingredient; the snapshot stays open for detail lookups"""
+        recipes = [row[:4] for row in snapshot.iter_recipe_rows()]
+        canonical = [canonical_name(name) for name in snapshot.ingredient_names()]
+        names = sorted(set(canonical))
+        positions = {name: i for i, name in enumerate(names)}
+        merged = [set() for _ in names]
+        for raw_index, name in enumerate(canonical):
+            merged[positions[name]].update(snapshot.recipes_with_ingredient(raw_index))
+        return cls(recipes, names, [sorted(p) for p in merged], snapshot)
+
+    def close(self):
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def ingredient_id(self, name):
+        """Index of an ingredient by its canonical name, or None"""
+        return self._ingredient_ids.get(canonical_name(name))
+
+    def all_of(self, ingredient_ids):
+        """Bitmap of recipes using every ingredient, ANDed rarest first"""
+        ordered = sorted(set(ingredient_ids), key=self.counts.__getitem__)
+        if not ordered:
+            return 0
+        result = self.bitmaps[ordered[0]]
+        for ingredient_id in ordered[1:]:
+            result &= self.bitmaps[ingredient_id]
+            if not result:
+                break
+        return result
+
+    def excluded_ingredients(self, exclude):
+        """Ingredient indices ruled out by (pattern, exception) pairs from allergens.exclusion_patterns"""
+        if not exclude:
+            return set()
+        return {i for i, name in enumerate(self.ingredient_names) if matches_exclusion(name, exclude)}
+
+    def excluded_bitmap(self, exclude):
+        """Bitmap of recipes using any excluded ingredient; AND-NOT it out of a result"""
+        excluded = 0
+        for ingredient_id in self.excluded_ingredients(exclude):
+            excluded |= self.bitmaps[ingredient_id]
+        return excluded
+
+    def rows(self, bitmap):
+        """(meal_id, name, category, area) of the recipes in a bitmap"""
+        return [self.recipes[i] for i in iter_bits(bitmap)]
+
+    def find_all(self, ingredients, exclude=()):
+        """Recipes that use every named ingredient and nothing excluded; unknown names match nothing"""
+        ids = [self.ingredient_id(name) for name in ingredients]
+        if not ids or None in ids:
+            return []
+        return self.rows(self.all_of(ids) & ~self.excluded_bitmap(exclude))
+
+    def expand(self, term, limit=8):
+        """Ingredient names matching a term by trigram similarity, as (name, score) pairs"""
+        return self.ngrams.search(canonical_name(term), limit)
+
+    def find_groups(self, groups, exclude=()):
+        """Recipes that use at least one ingredient of every group of names and nothing excluded"""
+        return self.rows(self.groups_bitmap(groups, exclude))
+
+    def groups_bitmap(self, groups, exclude=()):
+        """Bitmap behind find_groups"""
+        unions = []
+        for names in groups:
+            union = 0
+            for ingredient_id in {self.ingredient_id(name) for name in names} - {None}:
+                union |= self.bitmaps[ingredient_id]
+            unions.append(union)
+        if not unions:
+            return 0
+        unions.sort(key=int.bit_count)
+        result = unions[0]
+        for union in unions[1:]:
+            result &= union
+            if not result:
+                break
+        return result & ~self.excluded_bitmap(exclude)
+
+    def facet_filter(self, facet, value):
+        """Bitmap of recipes whose facet equals value, ignoring case; every recipe for None"""
+        if value is None:
+            return self.all_recipes
+        result = 0
+        for candidate, bitmap in self.facet_bitmaps[facet].items():
+            if candidate is not None and candidate.lower() == value.lower():
+                result |= bitmap
+        return result
+
+    def faceted(self, groups, category=None, area=None, exclude=()):
+        """find_groups narrowed to a category and area, plus per-value facet counts.
+
+        Returns (rows, facets) like search_recipes_faceted. Each count is a
+        popcount of the matches ANDed with one value's bitmap, taken under
+        the other facet's filter only, so no recipe row is visited.
+        """
+        matches = self.groups_bitmap(groups, exclude)
+        in_category = matches & self.facet_filter("category", category)
+        in_area = matches & self.facet_filter("area", area)
+        facets = {}
+        for facet, scope in (("category", in_area), ("area", in_category)):
+            counts = [(value or "Unknown", (scope & bitmap).bit_count())
+                      for value, bitmap in self.facet_bitmaps[facet].items()]
+            facets[facet] = sorted((pair for pair in counts if pair[1]), key=lambda pair: (-pair[1], pair[0]))
+        return self.rows(in_category & in_area), facets
+
+    def ranked(self, ingredients, limit=10, max_missing=None, exclude=()):
+        """Top recipes by how many of the ingredients they use.
+
+        Returns (meal_id, name, category, area, matched, missing, missing
+        ingredient names) ordered by matched count, then coverage, then
+        fewest missing. Matched counts are the product of the sparse matrix
+        with the query vector: every query ingredient's posting list adds
+        one to the recipes it appears in. Unknown names are ignored; recipes
+        on an excluded ingredient's posting list are dropped.
+        """
+        wanted = {self.ingredient_id(name) for name in ingredients} - {None}
+        matched = Counter()
+        for ingredient_id in wanted:
+            matched.update(self.postings[ingredient_id])
+        for ingredient_id in self.excluded_ingredients(exclude):
+            for i in self.postings[ingredient_id]:
+                matched.pop(i, None)
+
+        # Within one matched count, higher coverage and fewer missing both
+        # mean a smaller recipe, so buckets are ranked by size alone.
+        buckets = defaultdict(list)
+        for i, count in matched.items():
+            buckets[count].append(i)
+        results = []
+        for count in sorted(buckets, reverse=True):
+            bucket = buckets[count]
+            if max_missing is not None:
+                bucket = [i for i in bucket if self.sizes[i] - count <= max_missing]
+            best = heapq.nsmallest(limit - len(results), bucket,
+                                   key=lambda i: (self.sizes[i], self.recipes[i][0]))
+            for i in best:
+                missing = sorted(self.ingredient_names[ingredient_id]
+                                 for ingredient_id in self.recipe_ingredients[i] if ingredient_id not in wanted)
+                results.append(self.recipes[i] + (count, len(missing), missing))
+            if len(results) >= limit:
+                break
+        return results
+
+    def pantry(self, ingredients, exclude=()):
+        """Recipes whose every ingredient is among the given ones.
+
+        Every recipe using an ingredient outside the pantry is knocked out
+        with one OR per such ingredient, so the cost is a pass over the
+        vocabulary's bitmaps, never over recipe rows. Excluded ingredients
+        are simply taken out of the pantry first.
+        """
+        have = {self.ingredient_id(name) for name in ingredients} - {None} - self.excluded_ingredients(exclude)
+        excluded = 0
+        for ingredient_id, bitmap in enumerate(self.bitmaps):
+            if ingredient_id not in have:
+                excluded |= bitmap
+        return self.rows(self.any_ingredient & ~excluded)
+
+    def recipe_detail(self, meal_id):
+        """The get_recipe_detail dict for a recipe, read from the snapshot"""
+        index = self._positions.get(meal_id)
+        if index is None or self._snapshot is None:
+            return None
+        recipe = self._snapshot.recipe(index)
+        return {
+            "name": recipe["strMeal"],
+            "ingredients": [(self._snapshot.ingredient_name(ingredient), measure or "")
+                            for ingredient, measure in self._snapshot.recipe_ingredients(index)],
+            "region": recipe["strArea"] or "Unknown",
+            "category": recipe["strCategory"] or "Unknown",
+            "instructions": recipe["strInstructions"] or "No instructions found.",
+            "thumbnail": recipe["strMealThumb"],
+            "tags": recipe["strTags"],
+            "youtube": recipe["strYoutube"],
+            "source": recipe["strSource"],
+        }
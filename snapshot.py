@@ -0,0 +1,263 @@
+"""Compact, memory-mappable recipe snapshot built from recipes_cache.json.
+
+Convert with: python snapshot.py [recipes_cache.json] [recipes.snap]
+
+Layout (little-endian): a fixed header, a section table, then
+  recipes      one fixed-size record per recipe (dense index = position)
+  ingredients  one record per interned ingredient name
+  items        ingredient index per recipe ingredient line, in recipe order
+  measures     (offset, length) into the heap per recipe ingredient line
+  postings     recipe indices per ingredient (recipes-by-ingredient table)
+  heap         UTF-8 string heap (names, instructions, measures, ...)
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+SNAPSHOT_FILE = "recipes.snap"
+SNAPSHOT_VERSION = 1
+MAGIC = b"DPSNAP\x00" + bytes([SNAPSHOT_VERSION])
+NULL = 0xFFFFFFFF
+
+RECIPE_FIELDS = (
+    "strMeal", "strCategory", "strArea", "strInstructions",
+    "strMealThumb", "strTags", "strYoutube", "strSource",
+)
+
+HEADER = struct.Struct("<8sIIII")
+SECTION_NAMES = ("recipes", "ingredients", "items", "measures", "postings", "heap")
+SECTION_TABLE = struct.Struct(f"<{2 * len(SECTION_NAMES)}Q")
+RECIPE_RECORD = struct.Struct(f"<I{2 * len(RECIPE_FIELDS)}III")
+INGREDIENT_RECORD = struct.Struct("<IIII")
+
+
+def meal_ingredient_lines(meal):
+    """(normalized ingredient, measure) pairs of a raw meal record"""
+    lines = []
+    for i in range(1, 21):
+        ingredient = meal.get(f"strIngredient{i}")
+        if ingredient and ingredient.strip():
+            measure = meal.get(f"strMeasure{i}")
+            lines.append((ingredient.strip().lower(), measure.strip() if measure else ""))
+    return lines
+
+
+def build_snapshot(meals, path=SNAPSHOT_FILE):
+    """Write raw API meal records to a snapshot file atomically"""
+    heap = bytearray()
+    interned = {}
+
+    def add_string(value):
+        if value is None:
+            return NULL, 0
+        data = value.encode("utf-8")
+        if data not in interned:
+            interned[data] = (len(heap), len(data))
+            heap.extend(data)
+        return interned[data]
+
+    ingredient_ids = {}
+    postings_by_ingredient = []
+    recipes = bytearray()
+    items = []
+    measures = []
+
+    for index, meal in enumerate(meals):
+        fields = []
+        for field in RECIPE_FIELDS:
+            fields.extend(add_string(meal.get(field)))
+        lines = meal_ingredient_lines(meal)
+        recipes.extend(RECIPE_RECORD.pack(int(meal["idMeal"]), *fields, len(items), len(lines)))
+
+        for name, measure in lines:
+            if name not in ingredient_ids:
+                ingredient_ids[name] = len(ingredient_ids)
+                postings_by_ingredient.append([])
+            ingredient_id = ingredient_ids[name]
+            items.append(ingredient_id)
+            measures.extend(add_string(measure))
+            postings = postings_by_ingredient[ingredient_id]
+            if not postings or postings[-1] != index:
+                postings.append(index)
+
+    ingredients = bytearray()
+    postings = []
+    for name, ingredient_id in ingredient_ids.items():
+        recipe_indices = postings_by_ingredient[ingredient_id]
+        ingredients.extend(INGREDIENT_RECORD.pack(*add_string(name), len(postings), len(recipe_indices)))
+        postings.extend(recipe_indices)
+
+    sections = [
+        bytes(recipes),
+        bytes(ingredients),
+        struct.pack(f"<{len(items)}I", *items),
+        struct.pack(f"<{len(measures)}I", *measures),
+        struct.pack(f"<{len(postings)}I", *postings),
+        bytes(heap),
+    ]
+
+    offset = HEADER.size + SECTION_TABLE.size
+    table = []
+    for data in sections:
+        offset += -offset % 8
+        table.extend((offset, len(data)))
+        offset += len(data)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(meals), len(ingredient_ids), len(items), len(postings)))
+        f.write(SECTION_TABLE.pack(*table))
+        for data, section_offset in zip(sections, table[::2]):
+            f.write(b"\0" * (section_offset - f.tell()))
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+def is_current(path=SNAPSHOT_FILE, source_file="recipes_cache.json"):
+    """True if the snapshot exists and is not older than its JSON source"""
+    if not os.path.exists(path):
+        return False
+    return not os.path.exists(source_file) or os.path.getmtime(path) >= os.path.getmtime(source_file)
+
+
+def fingerprint(path=SNAPSHOT_FILE):
+    """SHA-256 hex digest of a snapshot file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Snapshot:
+    """Read-only view of a snapshot file; sections are decoded on access"""
+
+    def __init__(self, path=SNAPSHOT_FILE):
+        if sys.byteorder != "little":
+            raise RuntimeError("Snapshots can only be mapped on little-endian hosts")
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.recipe_count, self.ingredient_count, _, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a recipe snapshot")
+
+        table = SECTION_TABLE.unpack_from(self._map, HEADER.size)
+        view = memoryview(self._map)
+        sections = {}
+        for name, offset, length in zip(SECTION_NAMES, table[::2], table[1::2]):
+            sections[name] = view[offset:offset + length]
+        self._views = [view] + list(sections.values())
+        self._recipes = sections["recipes"]
+        self._ingredients = sections["ingredients"]
+        self._items = sections["items"].cast("I")
+        self._measures = sections["measures"].cast("I")
+        self._postings = sections["postings"].cast("I")
+        self._heap = sections["heap"]
+        self._views += [self._items, self._measures, self._postings]
+        self._ingredient_index = None
+
+    def close(self):
+        for view in reversed(getattr(self, "_views", [])):
+            view.release()
+        self._views = []
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _string(self, offset, length):
+        if offset == NULL:
+            return None
+        return str(self._heap[offset:offset + length], "utf-8")
+
+    def _recipe_record(self, index):
+        return RECIPE_RECORD.unpack_from(self._recipes, index * RECIPE_RECORD.size)
+
+    def meal_id(self, index):
+        """TheMealDB idMeal of the recipe at a dense index"""
+        return self._recipe_record(index)[0]
+
+    def recipe(self, index):
+        """Recipe fields (keyed like the API record) plus meal_id"""
+        record = self._recipe_record(index)
+        recipe = {"meal_id": record[0]}
+        for i, field in enumerate(RECIPE_FIELDS):
+            recipe[field] = self._string(record[1 + 2 * i], record[2 + 2 * i])
+        return recipe
+
+    def recipe_ingredients(self, index):
+        """(ingredient index, measure) pairs of a recipe, in recipe order"""
+        start, count = self._recipe_record(index)[-2:]
+        return [
+            (self._items[i], self._string(self._measures[2 * i], self._measures[2 * i + 1]))
+            for i in range(start, start + count)
+        ]
+
+    def ingredient_name(self, ingredient_index):
+        offset, length, _, _ = INGREDIENT_RECORD.unpack_from(
+            self._ingredients, ingredient_index * INGREDIENT_RECORD.size)
+        return self._string(offset, length)
+
+    def ingredient_index(self, name):
+        """Dense index of a normalized ingredient name, or None"""
+        if self._ingredient_index is None:
+            self._ingredient_index = {
+                self.ingredient_name(i): i for i in range(self.ingredient_count)
+            }
+        return self._ingredient_index.get(name.strip().lower())
+
+    def recipes_with_ingredient(self, ingredient_index):
+        """Dense recipe indices using an ingredient, ascending"""
+        _, _, start, count = INGREDIENT_RECORD.unpack_from(
+            self._ingredients, ingredient_index * INGREDIENT_RECORD.size)
+        return self._postings[start:start + count]
+
+    def ingredient_names(self):
+        """The interned ingredient vocabulary, indexed by ingredient index"""
+        return [self.ingredient_name(i) for i in range(self.ingredient_count)]
+
+    def iter_recipe_rows(self):
+        """Yield (meal_id, name, category, area, instructions, thumbnail, tags, youtube, source)"""
+        for index in range(self.recipe_count):
+            recipe = self.recipe(index)
+            yield (recipe["meal_id"],) + tuple(recipe[field] for field in RECIPE_FIELDS)
+
+    def iter_recipe_ingredients(self):
+        """Yield (meal_id, ingredient index, position, measure) per ingredient line"""
+        for index in range(self.recipe_count):
+            meal_id = self.meal_id(index)
+            for position, (ingredient_index, measure) in enumerate(self.recipe_ingredients(index), start=1):
+                yield meal_id, ingredient_index, position, measure
+
+    def iter_meals(self):
+        """Yield API-shaped meal dicts (ingredient names are normalized)"""
+        for index in range(self.recipe_count):
+            recipe = self.recipe(index)
+            meal = {"idMeal": str(recipe.pop("meal_id"))}
+            meal.update(recipe)
+            for position, (ingredient_index, measure) in enumerate(self.recipe_ingredients(index), start=1):
+                meal[f"strIngredient{position}"] = self.ingredient_name(ingredient_index)
+                meal[f"strMeasure{position}"] = measure
+            yield meal
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else "recipes_cache.json"
+    target = sys.argv[2] if len(sys.argv) > 2 else SNAPSHOT_FILE
+    with open(source, "r") as f:
+        meals = json.load(f)
+    build_snapshot(meals, target)
+    print(f"Wrote {target}: {len(meals)} recipes, "
+          f"{os.path.getsize(source)} -> {os.path.getsize(target)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import json
+import os
+import sys
+
+import pytest
+
+# The modules live flat at the repository root.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mealdb_client  # noqa: E402
+from http_cache import ResponseCache  # noqa: E402
+from mock_mealdb import MealStore, serve  # noqa: E402
+from recipe_index import RecipeIndex  # noqa: E402
+from snapshot import Snapshot, build_snapshot  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def meals():
+    """The raw API records of the bundled recipes_cache.json"""
+    with open(os.path.join(ROOT, "recipes_cache.json"), "r") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="session")
+def snapshot_file(meals, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("snapshot") / "recipes.snap")
+    build_snapshot(meals, path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def index(snapshot_file):
+    with RecipeIndex.from_snapshot(Snapshot(snapshot_file)) as recipe_index:
+        yield recipe_index
+
+
+@pytest.fixture(scope="session")
+def categories():
+    with open(os.path.join(ROOT, "categories_cache.json"), "r") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def mock_api(meals, categories, tmp_path, monkeypatch):
+    """A MealStore of the bundled catalog served locally, with mealdb_client
+    pointed at it, caching into tmp_path and retrying without delay"""
+    store = MealStore(meals, categories)
+    server, api_url = serve(store, port=0)
+    monkeypatch.setattr(mealdb_client, "API_URL", api_url)
+    monkeypatch.setattr(mealdb_client, "BACKOFF_BASE", 0.0)
+    monkeypatch.setattr(mealdb_client, "_cache", ResponseCache(str(tmp_path / "http_cache.sqlite3")))
+    mealdb_client.reset_stats()
+    yield store
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,50 @@
+import re
+
+import pytest
+
+from allergens import ALLERGEN_GROUPS, exclusion_patterns, matches_exclusion
+
+
+def excluded(term, name):
+    return matches_exclusion(name, exclusion_patterns([term]))
+
+
+@pytest.mark.parametrize("group, name", [
+    ("nuts", "peanut butter"), ("nuts", "flaked almond"), ("nuts", "pine nut"), ("nuts", "cashew nuts"),
+    ("dairy", "double cream"), ("dairy", "cheddar cheese"), ("dairy", "milk chocolate"), ("dairy", "ghee"),
+    ("gluten", "plain flour"), ("gluten", "soy sauce"), ("gluten", "udon noodle"), ("gluten", "puff pastry"),
+    ("shellfish", "tiger prawn"), ("shellfish", "mussels"), ("shellfish", "oyster sauce"),
+])
+def test_group_members(group, name):
+    assert excluded(group, name)
+
+
+@pytest.mark.parametrize("group, name", [
+    ("nuts", "nutmeg"), ("nuts", "coconut milk"), ("nuts", "butternut squash"), ("nuts", "water chestnut"),
+    ("dairy", "coconut milk"), ("dairy", "peanut butter"), ("dairy", "butter bean"), ("dairy", "cream of tartar"),
+    ("gluten", "rice noodle"), ("gluten", "cornflour"), ("gluten", "corn tortilla"), ("gluten", "salt"),
+    ("shellfish", "oyster mushroom"), ("shellfish", "salmon"),
+])
+def test_group_exceptions_and_non_members(group, name):
+    assert not excluded(group, name)
+
+
+def test_plain_term_matches_whole_words_after_canonicalization():
+    assert excluded("Peanuts", "peanut oil")
+    assert excluded("peanuts", "peanut")
+    assert not excluded("pea", "peanut")
+    assert not excluded("egg", "eggplant")
+
+
+def test_aliases_and_blank_terms():
+    assert exclusion_patterns(["nut"]) == exclusion_patterns(["nuts"])
+    assert exclusion_patterns(["  ", ""]) == []
+
+
+def test_patterns_use_portable_syntax():
+    # The same strings run as PostgreSQL regular expressions: no \b, \d or lookarounds.
+    for group in ALLERGEN_GROUPS:
+        for pattern, exception in exclusion_patterns([group]):
+            for regex in filter(None, (pattern, exception)):
+                re.compile(regex)
+                assert "\\b" not in regex and "(?=" not in regex and "(?<" not in regex
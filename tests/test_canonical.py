@@ -0,0 +1,64 @@
+import pytest
+
+from canonical import SYNONYMS, canonical_name, singular
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("Tomatoes", "tomato"),
+    ("  Fresh   Basil ", "basil"),
+    ("basil leaves", "basil"),
+    ("red onions", "red onion"),
+    ("potatoes", "potato"),
+    ("peaches", "peach"),
+    ("cherries", "cherry"),
+    ("chillies", "chilli"),
+    ("garlic, crushed", "garlic"),
+    ("butter (softened)", "butter"),
+    ("free-range eggs", "egg"),
+])
+def test_canonical_name(raw, expected):
+    assert canonical_name(raw) == expected
+
+
+@pytest.mark.parametrize("word", ["asparagus", "couscous", "hummus", "lemongrass", "swiss", "molasses", "citrus"])
+def test_singular_leaves_non_plurals_alone(word):
+    assert singular(word) == word
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("aubergine", "eggplant"),
+    ("Cilantro", "coriander"),
+    ("scallions", "spring onion"),
+    ("sea salt", "salt"),
+    ("extra virgin olive oil", "olive oil"),
+    ("chicken stock cube", "chicken stock"),
+])
+def test_synonyms(raw, expected):
+    assert canonical_name(raw) == expected
+
+
+def test_tinned_forms_stay_apart_from_fresh_tomato():
+    assert canonical_name("chopped tomatoes") == "canned tomato"
+    assert canonical_name("diced tomatoes") == "canned tomato"
+    assert canonical_name("tinned tomatos") == "canned tomato"
+    assert canonical_name("tomatoes") == "tomato"
+
+
+def test_mince_stays_apart_from_beef():
+    assert canonical_name("minced beef") == "beef mince"
+    assert canonical_name("ground beef") == "beef mince"
+    assert canonical_name("mince") == "beef mince"
+    assert canonical_name("beef") == "beef"
+    assert canonical_name("minced pork") == "pork mince"
+
+
+def test_descriptor_is_kept_when_it_is_the_whole_name():
+    assert canonical_name("fresh") == "fresh"
+
+
+@pytest.mark.parametrize("raw", list(SYNONYMS) + list(SYNONYMS.values()) + [
+    "Fresh Tomatoes", "freshly chopped parsley", "large free-range eggs", "chopped tomatoes",
+])
+def test_idempotent(raw):
+    once = canonical_name(raw)
+    assert canonical_name(once) == once
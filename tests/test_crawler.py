@@ -0,0 +1,100 @@
+import json
+
+import requests
+
+import crawler
+import mealdb_client
+from crawler import crawl_all_meals, crawl_by_first_letter, load_checkpoint, sync_meals
+
+CATEGORIES = ["Goat", "Vegan"]
+
+
+def _lookups():
+    return mealdb_client.endpoint_stats.get("lookup.php", {}).get("requests", 0)
+
+
+def _in_categories(meals, categories):
+    return [meal for meal in meals if meal["strCategory"] in categories]
+
+
+def test_crawl_fetches_every_listed_meal(mock_api, meals, tmp_path):
+    crawled, failed = crawl_all_meals(CATEGORIES, workers=2, checkpoint_file=str(tmp_path / "checkpoint.jsonl"))
+
+    assert failed == []
+    assert {meal["idMeal"] for meal in crawled} == {meal["idMeal"] for meal in _in_categories(meals, CATEGORIES)}
+
+
+def test_interrupted_crawl_resumes_from_checkpoint(mock_api, meals, tmp_path, monkeypatch):
+    checkpoint_file = str(tmp_path / "checkpoint.jsonl")
+    expected = _in_categories(meals, CATEGORIES)
+    broken = expected[0]["idMeal"]
+    fetch_meal_detail = crawler.fetch_meal_detail
+
+    def flaky_fetch(meal_id, revalidate=False):
+        if meal_id == broken:
+            raise requests.ConnectionError("connection reset")
+        return fetch_meal_detail(meal_id, revalidate)
+
+    monkeypatch.setattr(crawler, "fetch_meal_detail", flaky_fetch)
+    crawled, failed = crawl_all_meals(CATEGORIES, workers=2, checkpoint_file=checkpoint_file)
+    assert failed == [f"lookup.php?i={broken}"]
+    assert len(crawled) == len(expected) - 1
+    assert broken not in load_checkpoint(checkpoint_file)
+
+    monkeypatch.setattr(crawler, "fetch_meal_detail", fetch_meal_detail)
+    mealdb_client.reset_stats()
+    crawled, failed = crawl_all_meals(CATEGORIES, workers=2, checkpoint_file=checkpoint_file)
+    assert failed == []
+    assert [meal["idMeal"] for meal in crawled] == [meal["idMeal"] for meal in expected]
+    assert _lookups() == 1
+
+
+def test_failed_listing_is_reported(mock_api, tmp_path, monkeypatch):
+    fetch_category_listing = crawler.fetch_category_listing
+
+    def flaky_listing(category):
+        if category == "Goat":
+            raise requests.Timeout("read timed out")
+        return fetch_category_listing(category)
+
+    monkeypatch.setattr(crawler, "fetch_category_listing", flaky_listing)
+    crawled, failed = crawl_all_meals(CATEGORIES, workers=2, checkpoint_file=str(tmp_path / "checkpoint.jsonl"))
+    assert failed == ["filter.php?c=Goat"]
+    assert crawled and all(meal["strCategory"] == "Vegan" for meal in crawled)
+
+
+def test_sync_looks_up_only_new_and_changed_meals(mock_api, meals, tmp_path):
+    cached = _in_categories(meals, CATEGORIES)
+    changed = dict(cached[0], strMeal="Renamed")
+    added = dict(cached[1], idMeal="99999", strMeal="Brand New")
+    mock_api.put(changed)
+    mock_api.put(added)
+
+    synced, fetched_ids, failed = sync_meals(cached, CATEGORIES, workers=2,
+                                             checkpoint_file=str(tmp_path / "checkpoint.jsonl"))
+    assert failed == []
+    assert fetched_ids == {changed["idMeal"], "99999"}
+    assert _lookups() == 2
+    assert synced[0]["strMeal"] == "Renamed"
+    assert synced[-1]["strMeal"] == "Brand New"
+    assert synced[1:-1] == cached[1:]
+
+
+def test_sync_ignores_unrelated_checkpoint_entries(mock_api, meals, tmp_path):
+    cached = _in_categories(meals, CATEGORIES)
+    checkpoint_file = tmp_path / "checkpoint.jsonl"
+    leftover = dict(cached[0], strMeal="Left over from another crawl")
+    checkpoint_file.write_text(json.dumps(leftover) + "\n")
+
+    synced, fetched_ids, failed = sync_meals(cached, CATEGORIES, workers=2, checkpoint_file=str(checkpoint_file))
+    assert (fetched_ids, failed) == (set(), [])
+    assert synced == cached
+
+
+def test_letter_sweep_fills_gaps_from_listings(mock_api, meals, categories, tmp_path):
+    swept, failed = crawl_by_first_letter(categories, workers=4, checkpoint_file=str(tmp_path / "checkpoint.jsonl"))
+
+    assert failed == []
+    assert {meal["idMeal"] for meal in swept} == {meal["idMeal"] for meal in meals}
+    missed = [meal for meal in meals if not meal["strMeal"][:1].lower().isalnum()]
+    assert _lookups() == len(missed)
@@ -0,0 +1,61 @@
+import itertools
+
+import http_cache
+from http_cache import ResponseCache
+
+
+def _cache(tmp_path, monkeypatch, max_bytes):
+    clock = itertools.count(1000)
+    monkeypatch.setattr(http_cache.time, "time", lambda: next(clock))
+    return ResponseCache(str(tmp_path / "cache.sqlite3"), max_bytes=max_bytes)
+
+
+def test_entry_keeps_validators(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, monkeypatch, max_bytes=1024)
+    cache.put("a", b"body", etag='"v1"', last_modified="Mon, 05 Oct 2026 10:00:00 GMT")
+
+    entry = cache.get("a")
+    assert (entry["body"], entry["etag"], entry["last_modified"]) == (b"body", '"v1"', "Mon, 05 Oct 2026 10:00:00 GMT")
+    assert cache.get("missing") is None
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, monkeypatch, max_bytes=25)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"x" * 10)
+    cache.get("a")
+    cache.put("c", b"x" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.evictions == 1
+
+
+def test_replacing_an_entry_does_not_count_twice(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, monkeypatch, max_bytes=25)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"x" * 10)
+    cache.put("a", b"y" * 10)
+
+    assert cache.evictions == 0
+    assert cache.get("a")["body"] == b"y" * 10
+
+
+def test_refresh_restarts_the_ttl(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, monkeypatch, max_bytes=1024)
+    cache.put("a", b"body")
+    stored_at = cache.get("a")["stored_at"]
+    cache.refresh("a")
+
+    assert cache.get("a")["stored_at"] > stored_at
+
+
+def test_size_survives_reopening(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, monkeypatch, max_bytes=25)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"x" * 10)
+
+    reopened = ResponseCache(str(tmp_path / "cache.sqlite3"), max_bytes=25)
+    reopened.put("c", b"x" * 10)
+    assert reopened.evictions == 1
+    assert reopened.get("a") is None
@@ -0,0 +1,113 @@
+import pytest
+import requests
+
+import mealdb_client
+from mealdb_client import get_json
+from mock_mealdb import MealStore, serve
+
+
+class FlakySession:
+    """Raises an error for the first `failures` requests, then hands them to a real session"""
+
+    def __init__(self, error, failures):
+        self.error = error
+        self.failures = failures
+        self.calls = 0
+        self.session = requests.Session()
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return self.session.get(url, **kwargs)
+
+
+def _stats(endpoint):
+    return mealdb_client.endpoint_stats[endpoint]
+
+
+def test_transient_errors_are_retried(mock_api, monkeypatch):
+    session = FlakySession(requests.ConnectionError("connection reset"), failures=2)
+    monkeypatch.setattr(mealdb_client, "get_session", lambda: session)
+
+    assert get_json("filter.php", c="Beef")["meals"]
+    assert session.calls == 3
+    assert _stats("filter.php")["retries"] == 2
+    assert mealdb_client.request_count() == 3
+
+
+def test_retries_give_up_after_max_retries(mock_api, monkeypatch):
+    session = FlakySession(requests.Timeout("read timed out"), failures=100)
+    monkeypatch.setattr(mealdb_client, "get_session", lambda: session)
+
+    with pytest.raises(requests.Timeout):
+        get_json("filter.php", c="Beef")
+    assert session.calls == mealdb_client.MAX_RETRIES + 1
+    assert _stats("filter.php")["errors"] == 1
+
+
+def test_non_retryable_errors_fail_at_once(mock_api, monkeypatch):
+    session = FlakySession(requests.exceptions.InvalidURL("bad url"), failures=100)
+    monkeypatch.setattr(mealdb_client, "get_session", lambda: session)
+
+    with pytest.raises(requests.exceptions.InvalidURL):
+        get_json("filter.php", c="Beef")
+    assert session.calls == 1
+
+
+def test_client_errors_are_not_retried(mock_api):
+    with pytest.raises(requests.HTTPError) as error:
+        get_json("random.php")
+    assert error.value.response.status_code == 404
+    assert _stats("random.php")["requests"] == 1
+
+
+def test_server_errors_are_retried(monkeypatch, tmp_path):
+    server, api_url = serve(MealStore([], []), port=0, error_rate=1.0)
+    monkeypatch.setattr(mealdb_client, "API_URL", api_url)
+    monkeypatch.setattr(mealdb_client, "BACKOFF_BASE", 0.0)
+    monkeypatch.setattr(mealdb_client, "CACHE_ENABLED", False)
+    mealdb_client.reset_stats()
+    try:
+        with pytest.raises(requests.HTTPError) as error:
+            get_json("list.php", c="list")
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert error.value.response.status_code == 503
+    assert _stats("list.php")["requests"] == mealdb_client.MAX_RETRIES + 1
+
+
+def test_backoff_delay_is_capped():
+    for attempt in range(10):
+        delay = mealdb_client._backoff_delay(attempt)
+        assert 0 <= delay <= min(mealdb_client.BACKOFF_CAP, mealdb_client.BACKOFF_BASE * 2 ** attempt)
+
+
+def test_stale_response_is_revalidated_with_304(mock_api):
+    first = get_json("filter.php", c="Beef")
+    second = get_json("filter.php", c="Beef")
+
+    assert second == first
+    stats = _stats("filter.php")
+    assert (stats["requests"], stats["cache_misses"], stats["revalidated"]) == (2, 1, 1)
+
+
+def test_changed_response_replaces_the_cached_one(mock_api):
+    before = get_json("filter.php", c="Beef")["meals"]
+    meal = dict(mock_api.by_id[before[0]["idMeal"]], strMeal="Renamed Beef")
+    mock_api.put(meal)
+
+    after = get_json("filter.php", c="Beef")["meals"]
+    assert after[0]["strMeal"] == "Renamed Beef"
+    assert _stats("filter.php")["cache_misses"] == 2
+
+
+def test_fresh_lookup_is_served_from_cache(mock_api, meals):
+    meal_id = meals[0]["idMeal"]
+    get_json("lookup.php", i=meal_id)
+    get_json("lookup.php", i=meal_id)
+    get_json("lookup.php", max_age=0, i=meal_id)
+
+    stats = _stats("lookup.php")
+    assert (stats["requests"], stats["cache_hits"], stats["revalidated"]) == (2, 1, 1)
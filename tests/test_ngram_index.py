@@ -0,0 +1,32 @@
+from ngram_index import NgramIndex, similarity, trigrams, word_trigrams
+
+
+def test_trigrams_match_pg_trgm():
+    # SELECT show_trgm('cat') -> {"  c"," ca","at ",cat}
+    assert word_trigrams("cat") == {"  c", " ca", "cat", "at "}
+    assert trigrams("Red Onion") == word_trigrams("red") | word_trigrams("onion")
+    assert trigrams("--") == set()
+
+
+def test_similarity():
+    assert similarity(trigrams("tomato"), trigrams("tomato")) == 1.0
+    assert similarity(set(), set()) == 0.0
+    # SELECT similarity('tomato', 'tomatoe') = 0.6666667
+    assert round(similarity(trigrams("tomato"), trigrams("tomatoe")), 4) == 0.6667
+
+
+def test_search_ranks_exact_name_first():
+    ngrams = NgramIndex(["chicken", "chicken breast", "chicken stock", "chickpea", "beef"])
+    names = [name for name, _ in ngrams.search("chicken")]
+    assert names[0] == "chicken"
+    assert set(names) == {"chicken", "chicken breast", "chicken stock"}
+    assert all(score == 1.0 for _, score in ngrams.search("chicken"))
+
+
+def test_search_tolerates_typos_and_respects_limit():
+    ngrams = NgramIndex(["tomato", "potato", "mozzarella", "cinnamon"])
+    assert ngrams.search("tomatoe")[0][0] == "tomato"
+    assert ngrams.search("mozzarela")[0][0] == "mozzarella"
+    assert ngrams.search("cinamon")[0][0] == "cinnamon"
+    assert len(NgramIndex([f"salt {i}" for i in range(20)]).search("salt", limit=5)) == 5
+    assert ngrams.search("xyz") == []
@@ -0,0 +1,119 @@
+import random
+
+import pytest
+
+from allergens import exclusion_patterns, matches_exclusion
+from canonical import canonical_name
+from recipe_index import bitmap_from_indices, iter_bits
+from snapshot import meal_ingredient_lines
+
+
+@pytest.fixture(scope="module")
+def catalog(meals):
+    """(meal_id, name, category, area) -> canonical ingredient set, the brute-force reference"""
+    return {
+        (int(meal["idMeal"]), meal["strMeal"], meal["strCategory"], meal["strArea"]):
+            {canonical_name(name) for name, _ in meal_ingredient_lines(meal)}
+        for meal in meals
+    }
+
+
+@pytest.fixture(scope="module")
+def vocabulary(catalog):
+    return sorted(set().union(*catalog.values()))
+
+
+def queries(vocabulary, count=100, sizes=(1, 3), seed=7):
+    rng = random.Random(seed)
+    return [rng.sample(vocabulary, rng.randint(*sizes)) for _ in range(count)]
+
+
+EXCLUSIONS = [[], ["nuts"], ["dairy"], ["gluten", "shellfish"], ["garlic", "dairy"]]
+
+
+def allowed(ingredients, patterns):
+    return not any(matches_exclusion(name, patterns) for name in ingredients)
+
+
+def test_bitmap_helpers():
+    bits = [0, 3, 8, 63, 64, 1000]
+    assert list(iter_bits(bitmap_from_indices(bits, 1001))) == bits
+    assert list(iter_bits(0)) == []
+
+
+def test_find_all(index, catalog, vocabulary):
+    for i, query in enumerate(queries(vocabulary, sizes=(1, 2))):
+        exclude = exclusion_patterns(EXCLUSIONS[i % len(EXCLUSIONS)])
+        expected = {row for row, ingredients in catalog.items()
+                    if set(query) <= ingredients and allowed(ingredients, exclude)}
+        assert set(index.find_all(query, exclude)) == expected
+    assert index.find_all(["no such ingredient"]) == []
+
+
+def test_find_groups(index, catalog, vocabulary):
+    for i, query in enumerate(queries(vocabulary, count=50, sizes=(4, 12))):
+        groups = [query[:len(query) // 2], query[len(query) // 2:]]
+        exclude = exclusion_patterns(EXCLUSIONS[i % len(EXCLUSIONS)])
+        expected = {row for row, ingredients in catalog.items()
+                    if all(ingredients & set(group) for group in groups) and allowed(ingredients, exclude)}
+        assert set(index.find_groups(groups, exclude)) == expected
+
+
+def test_ranked(index, catalog, vocabulary):
+    for i, query in enumerate(queries(vocabulary, sizes=(2, 8))):
+        max_missing = [None, 3, 8][i % 3]
+        exclude = exclusion_patterns(EXCLUSIONS[i % len(EXCLUSIONS)])
+        scored = []
+        for row, ingredients in catalog.items():
+            matched = len(ingredients & set(query))
+            missing = sorted(ingredients - set(query))
+            if matched and allowed(ingredients, exclude) and (max_missing is None or len(missing) <= max_missing):
+                scored.append(((-matched, len(ingredients), row[0]), row + (matched, len(missing), missing)))
+        expected = [result for _, result in sorted(scored)[:10]]
+        assert index.ranked(query, 10, max_missing, exclude) == expected
+
+
+def test_pantry(index, catalog, vocabulary):
+    for i, pantry in enumerate(queries(vocabulary, count=50, sizes=(40, 120))):
+        exclude = exclusion_patterns(EXCLUSIONS[i % len(EXCLUSIONS)])
+        expected = {row for row, ingredients in catalog.items()
+                    if ingredients <= set(pantry) and allowed(ingredients, exclude)}
+        assert set(index.pantry(pantry, exclude)) == expected
+    everything = set(index.pantry(vocabulary))
+    assert everything == set(catalog)
+
+
+def test_faceted(index, catalog, vocabulary):
+    categories = sorted({row[2] for row in catalog})
+    areas = sorted({row[3] for row in catalog})
+    rng = random.Random(11)
+    for query in queries(vocabulary, count=60, sizes=(4, 12)):
+        groups = [query[:2], query[2:]]
+        category = rng.choice(categories + [None])
+        area = rng.choice(areas + [None])
+        if category and rng.random() < 0.5:
+            category = category.upper()
+        matches = [row for row, ingredients in catalog.items() if all(ingredients & set(group) for group in groups)]
+
+        def in_category(row):
+            return category is None or row[2].lower() == category.lower()
+
+        def in_area(row):
+            return area is None or row[3].lower() == area.lower()
+
+        rows, facets = index.faceted(groups, category, area)
+        assert set(rows) == {row for row in matches if in_category(row) and in_area(row)}
+        for facet, column, scope in (("category", 2, in_area), ("area", 3, in_category)):
+            counts = {}
+            for row in matches:
+                if scope(row):
+                    counts[row[column]] = counts.get(row[column], 0) + 1
+            assert facets[facet] == sorted(counts.items(), key=lambda pair: (-pair[1], pair[0]))
+
+
+def test_recipe_detail(index, meals):
+    meal = meals[0]
+    detail = index.recipe_detail(int(meal["idMeal"]))
+    assert detail["name"] == meal["strMeal"]
+    assert detail["ingredients"] == meal_ingredient_lines(meal)
+    assert index.recipe_detail(-1) is None
@@ -0,0 +1,27 @@
+from snapshot import Snapshot, build_snapshot, fingerprint, meal_ingredient_lines, RECIPE_FIELDS
+
+
+def test_round_trip(meals, snapshot_file):
+    with Snapshot(snapshot_file) as snapshot:
+        assert snapshot.recipe_count == len(meals)
+        for meal, restored in zip(meals, snapshot.iter_meals()):
+            assert restored["idMeal"] == meal["idMeal"]
+            for field in RECIPE_FIELDS:
+                assert restored[field] == meal.get(field)
+            assert meal_ingredient_lines(restored) == meal_ingredient_lines(meal)
+
+
+def test_postings_match_recipe_ingredients(meals, snapshot_file):
+    with Snapshot(snapshot_file) as snapshot:
+        for ingredient_index, name in enumerate(snapshot.ingredient_names()):
+            assert snapshot.ingredient_index(name) == ingredient_index
+            expected = [i for i, meal in enumerate(meals) if name in dict(meal_ingredient_lines(meal))]
+            assert list(snapshot.recipes_with_ingredient(ingredient_index)) == expected
+
+
+def test_fingerprint_is_stable(meals, snapshot_file, tmp_path):
+    again = str(tmp_path / "again.snap")
+    build_snapshot(meals, again)
+    assert fingerprint(again) == fingerprint(snapshot_file)
+    build_snapshot(meals[1:], again)
+    assert fingerprint(again) != fingerprint(snapshot_file)